@@ -1,7 +1,6 @@
 import asyncio
 import hashlib
 import hmac
-import json
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -9,15 +8,17 @@ from datetime import datetime, timedelta
 from typing import Optional
 from urllib.parse import parse_qsl, unquote
 
+import orjson
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 import migrate_to_sqlite
-from data_manager import DataManager
+from data_manager import MAX_SYNC_DAYS, DataManager, earnings_period_start, parse_hhmm
 
 load_dotenv()
 
@@ -26,6 +27,7 @@ WEBAPP_URL = os.getenv("WEBAPP_URL", "")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 DEV_USER_ID = os.getenv("DEV_USER_ID", "")  # Set this to your Telegram user ID for browser testing
 INIT_DATA_MAX_AGE_SECONDS = 24 * 60 * 60
+ONE_DAY = timedelta(days=1)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,7 +47,7 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[dict]:
     """
     try:
         parsed = dict(parse_qsl(init_data, strict_parsing=True))
-    except Exception:
+    except ValueError:
         return None
 
     received_hash = parsed.pop("hash", None)
@@ -75,8 +77,8 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[dict]:
         return None
 
     try:
-        return json.loads(unquote(user_str))
-    except Exception:
+        return orjson.loads(unquote(user_str))
+    except orjson.JSONDecodeError:
         return None
 
 
@@ -147,9 +149,8 @@ async def lifespan(app: FastAPI):
     try:
         if BOT_TOKEN:
             from main import SalaryBot
-            salary_bot = SalaryBot(BOT_TOKEN)
-            # Inject shared data_manager so bot and API share the same data
-            salary_bot.data_manager = data_manager
+            # Shared data_manager: bot and API use one connection, migration already ran
+            salary_bot = SalaryBot(BOT_TOKEN, data_manager=data_manager)
             bot_task = asyncio.create_task(salary_bot.start_bot())
             logger.info("Bot polling started")
 
@@ -169,6 +170,7 @@ async def lifespan(app: FastAPI):
                 await task
             except asyncio.CancelledError:
                 pass
+    await data_manager.close_clickup_clients()
 
 
 app = FastAPI(title="SalaryCounter API", lifespan=lifespan)
@@ -180,16 +182,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# JSON-отчёты (сессии за неделю/месяц, разбивки) хорошо жмутся; мелкие ответы не трогаем
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
-api = FastAPI()
+# Эндпоинты, которые только ходят в SQLite, объявлены обычными def: FastAPI
+# выполняет их в threadpool и не блокирует event loop, общий с ботом.
+# orjson: ответы вебаппа (сессии, разбивки) сериализуются заметно быстрее stdlib json
+api = FastAPI(default_response_class=ORJSONResponse)
 
 
 @api.get("/user/profile")
-async def get_user_profile(user_id: str = Depends(get_current_user)):
+def get_user_profile(user_id: str = Depends(get_current_user)):
     rate = data_manager.get_rate(user_id)
     clickup = data_manager.get_clickup_settings(user_id)
     return {
@@ -201,12 +208,12 @@ async def get_user_profile(user_id: str = Depends(get_current_user)):
 
 
 @api.get("/user/rate")
-async def get_rate(user_id: str = Depends(get_current_user)):
+def get_rate(user_id: str = Depends(get_current_user)):
     return {"rate": data_manager.get_rate(user_id)}
 
 
 @api.put("/user/rate")
-async def update_rate(body: RateUpdate, user_id: str = Depends(get_current_user)):
+def update_rate(body: RateUpdate, user_id: str = Depends(get_current_user)):
     if body.rate <= 0:
         raise HTTPException(status_code=400, detail="Rate must be positive")
     data_manager.set_rate(user_id, body.rate)
@@ -214,7 +221,7 @@ async def update_rate(body: RateUpdate, user_id: str = Depends(get_current_user)
 
 
 @api.get("/user/goal")
-async def get_goal(user_id: str = Depends(get_current_user)):
+def get_goal(user_id: str = Depends(get_current_user)):
     return {
         "goal": data_manager.get_monthly_goal(user_id),
         "progress": data_manager.get_month_progress(user_id),
@@ -222,7 +229,7 @@ async def get_goal(user_id: str = Depends(get_current_user)):
 
 
 @api.put("/user/goal")
-async def update_goal(body: GoalUpdate, user_id: str = Depends(get_current_user)):
+def update_goal(body: GoalUpdate, user_id: str = Depends(get_current_user)):
     if body.goal < 0:
         raise HTTPException(status_code=400, detail="Goal must be non-negative")
     data_manager.set_monthly_goal(user_id, body.goal)
@@ -230,8 +237,8 @@ async def update_goal(body: GoalUpdate, user_id: str = Depends(get_current_user)
 
 
 @api.get("/bonuses")
-async def list_bonuses(year: Optional[int] = None,
-                       user_id: str = Depends(get_current_user)):
+def list_bonuses(year: Optional[int] = None,
+                 user_id: str = Depends(get_current_user)):
     if year:
         bonuses = data_manager.get_bonuses(
             user_id, start_date=f"{year}-01-01", end_date=f"{year}-12-31")
@@ -241,7 +248,7 @@ async def list_bonuses(year: Optional[int] = None,
 
 
 @api.post("/bonuses")
-async def create_bonus(body: BonusCreate, user_id: str = Depends(get_current_user)):
+def create_bonus(body: BonusCreate, user_id: str = Depends(get_current_user)):
     if body.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
     try:
@@ -253,30 +260,27 @@ async def create_bonus(body: BonusCreate, user_id: str = Depends(get_current_use
 
 
 @api.delete("/bonuses/{bonus_id}")
-async def delete_bonus(bonus_id: int, user_id: str = Depends(get_current_user)):
+def delete_bonus(bonus_id: int, user_id: str = Depends(get_current_user)):
     if not data_manager.delete_bonus(user_id, bonus_id):
         raise HTTPException(status_code=404, detail="Bonus not found")
     return {"deleted": True}
 
 
-def _valid_hhmm(value: str) -> bool:
-    parts = value.split(":")
-    if len(parts) != 2 or not all(p.isdigit() for p in parts):
-        return False
-    return 0 <= int(parts[0]) <= 23 and 0 <= int(parts[1]) <= 59
-
-
 @api.get("/user/notifications")
-async def get_notification_settings(user_id: str = Depends(get_current_user)):
+def get_notification_settings(user_id: str = Depends(get_current_user)):
     return data_manager.get_notification_settings(user_id)
 
 
 @api.put("/user/notifications")
-async def update_notification_settings(body: NotificationSettingsUpdate,
-                                       user_id: str = Depends(get_current_user)):
+def update_notification_settings(body: NotificationSettingsUpdate,
+                                 user_id: str = Depends(get_current_user)):
     fields = {k: v for k, v in body.model_dump().items() if v is not None}
-    if "digest_time" in fields and not _valid_hhmm(fields["digest_time"]):
-        raise HTTPException(status_code=400, detail="digest_time must be HH:MM")
+    if "digest_time" in fields:
+        parsed = parse_hhmm(fields["digest_time"])
+        if parsed is None:
+            raise HTTPException(status_code=400, detail="digest_time must be HH:MM")
+        # Шедулер сравнивает digest_time строкой с '%H:%M' — храним с ведущими нулями
+        fields["digest_time"] = "%02d:%02d" % parsed
     if "long_timer_hours" in fields and fields["long_timer_hours"] <= 0:
         raise HTTPException(status_code=400, detail="long_timer_hours must be positive")
     data_manager.set_notification_settings(user_id, **fields)
@@ -285,16 +289,13 @@ async def update_notification_settings(body: NotificationSettingsUpdate,
 
 def _sum_sessions(work_sessions: dict, start_date: datetime, end_date: datetime) -> dict:
     """Суммирует часы и заработок по дневным сессиям в диапазоне [start_date, end_date] включительно."""
-    start = start_date.date()
-    end = end_date.date()
+    # Ключи — даты ISO, поэтому диапазон проверяется сравнением строк
+    start = start_date.date().isoformat()
+    end = end_date.date().isoformat()
     total_hours = 0.0
     total_earnings = 0.0
     for date_str, session in work_sessions.items():
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except ValueError:
-            continue
-        if start <= d <= end:
+        if start <= date_str <= end:
             total_hours += session.get("total_hours", 0)
             total_earnings += session.get("total_earnings", 0)
     return {"total_hours": total_hours, "total_earnings": total_earnings}
@@ -305,34 +306,17 @@ def _daily_series(work_sessions: dict, start_date: datetime, end_date: datetime)
     out = []
     cur = start_date
     while cur.date() <= end_date.date():
-        ds = cur.strftime("%Y-%m-%d")
+        ds = cur.date().isoformat()
         session = work_sessions.get(ds, {})
         out.append({
             "date": ds,
             "total_hours": session.get("total_hours", 0),
             "total_earnings": session.get("total_earnings", 0),
         })
-        cur += timedelta(days=1)
+        cur += ONE_DAY
     return out
 
 
-def _monthly_series(work_sessions: dict, year: int) -> list:
-    """Разбивка по 12 месяцам указанного года."""
-    totals = {m: {"total_hours": 0, "total_earnings": 0} for m in range(1, 13)}
-    for date_str, session in work_sessions.items():
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-        except ValueError:
-            continue
-        if d.year != year:
-            continue
-        totals[d.month]["total_hours"] += session.get("total_hours", 0)
-        totals[d.month]["total_earnings"] += session.get("total_earnings", 0)
-    return [
-        {"month": f"{year}-{m:02d}", **totals[m]} for m in range(1, 13)
-    ]
-
-
 def _previous(work_sessions: dict, start_date: datetime, end_date: datetime, label: str, series: Optional[list] = None) -> dict:
     """Итоги предыдущего эквивалентного периода для сравнения (+ опциональная разбивка)."""
     totals = _sum_sessions(work_sessions, start_date, end_date)
@@ -343,12 +327,12 @@ def _previous(work_sessions: dict, start_date: datetime, end_date: datetime, lab
 
 
 @api.get("/earnings/today")
-async def earnings_today(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_today(user_id: str = Depends(get_current_user)):
     now = datetime.now()
     today = now.strftime("%Y-%m-%d")
-    session = work_sessions.get(today, {})
     prev_day = now - timedelta(days=1)
+    work_sessions = data_manager.get_work_sessions(user_id, prev_day.strftime("%Y-%m-%d"), today)
+    session = work_sessions.get(today, {})
     return {
         "date": today,
         "total_hours": session.get("total_hours", 0),
@@ -359,12 +343,13 @@ async def earnings_today(user_id: str = Depends(get_current_user)):
 
 
 @api.get("/earnings/yesterday")
-async def earnings_yesterday(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_yesterday(user_id: str = Depends(get_current_user)):
     yesterday_dt = datetime.now() - timedelta(days=1)
     yesterday = yesterday_dt.strftime("%Y-%m-%d")
-    session = work_sessions.get(yesterday, {})
     day_before = yesterday_dt - timedelta(days=1)
+    work_sessions = data_manager.get_work_sessions(
+        user_id, day_before.strftime("%Y-%m-%d"), yesterday)
+    session = work_sessions.get(yesterday, {})
     return {
         "date": yesterday,
         "total_hours": session.get("total_hours", 0),
@@ -375,14 +360,16 @@ async def earnings_yesterday(user_id: str = Depends(get_current_user)):
 
 
 @api.get("/earnings/week")
-async def earnings_week(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_week(user_id: str = Depends(get_current_user)):
     today = datetime.now()
     monday = today - timedelta(days=today.weekday())
+    # Сессии нужны только за эту и прошлую неделю
+    work_sessions = data_manager.get_work_sessions(
+        user_id, (monday - timedelta(days=7)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
     days = []
     current = monday
     while current <= today:
-        date_str = current.strftime("%Y-%m-%d")
+        date_str = current.date().isoformat()
         session = work_sessions.get(date_str, {})
         days.append({
             "date": date_str,
@@ -390,7 +377,7 @@ async def earnings_week(user_id: str = Depends(get_current_user)):
             "total_earnings": session.get("total_earnings", 0),
             "sessions": session.get("sessions", []),
         })
-        current += timedelta(days=1)
+        current += ONE_DAY
     total_hours = sum(d["total_hours"] for d in days)
     total_earnings = sum(d["total_earnings"] for d in days)
     return {
@@ -410,32 +397,36 @@ async def earnings_week(user_id: str = Depends(get_current_user)):
 
 
 @api.get("/earnings/week-details")
-async def earnings_week_details(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_week_details(user_id: str = Depends(get_current_user)):
+    today = datetime.now().date()
+    work_sessions = data_manager.get_daily_totals(
+        user_id, earnings_period_start("week_details", today), today.isoformat())
     report = data_manager.generate_week_details_report(work_sessions)
     return {"report": report}
 
 
 @api.get("/earnings/month")
-async def earnings_month(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_month(user_id: str = Depends(get_current_user)):
     today = datetime.now()
     first = today.replace(day=1)
+    prev_month_last = first - timedelta(days=1)
+    prev_month_first = prev_month_last.replace(day=1)
+    # Итоги нужны только за этот и прошлый месяц
+    work_sessions = data_manager.get_daily_totals(
+        user_id, prev_month_first.date().isoformat(), today.date().isoformat())
     days = []
     current = first
     while current <= today:
-        date_str = current.strftime("%Y-%m-%d")
+        date_str = current.date().isoformat()
         session = work_sessions.get(date_str, {})
         days.append({
             "date": date_str,
             "total_hours": session.get("total_hours", 0),
             "total_earnings": session.get("total_earnings", 0),
         })
-        current += timedelta(days=1)
+        current += ONE_DAY
     total_hours = sum(d["total_hours"] for d in days)
     total_earnings = sum(d["total_earnings"] for d in days)
-    prev_month_last = first - timedelta(days=1)
-    prev_month_first = prev_month_last.replace(day=1)
     progress = data_manager.get_month_progress(user_id, now=today)
     return {
         "period_start": first.strftime("%Y-%m-%d"),
@@ -458,54 +449,53 @@ async def earnings_month(user_id: str = Depends(get_current_user)):
 
 
 @api.get("/earnings/month-weeks")
-async def earnings_month_weeks(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_month_weeks(user_id: str = Depends(get_current_user)):
+    today = datetime.now().date()
+    work_sessions = data_manager.get_daily_totals(
+        user_id, earnings_period_start("month_weeks", today), today.isoformat())
     report = data_manager.generate_month_weeks_report(work_sessions)
     return {"report": report}
 
 
 @api.get("/earnings/prev-month-weeks")
-async def earnings_prev_month_weeks(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
+def earnings_prev_month_weeks(user_id: str = Depends(get_current_user)):
+    today = datetime.now().date()
+    work_sessions = data_manager.get_daily_totals(
+        user_id, earnings_period_start("prev_month_weeks", today), today.isoformat())
     report = data_manager.generate_prev_month_weeks_report(work_sessions)
     return {"report": report}
 
 
 @api.get("/earnings/year")
-async def earnings_year(user_id: str = Depends(get_current_user)):
-    work_sessions = data_manager.get_work_sessions(user_id)
-    now = datetime.now()
-    current_year = now.year
-    months = {}
-    for date_str, session in work_sessions.items():
-        try:
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            if d.year != current_year:
-                continue
-            key = d.strftime("%Y-%m")
-            if key not in months:
-                months[key] = {"month": key, "total_hours": 0, "total_earnings": 0}
-            months[key]["total_hours"] += session.get("total_hours", 0)
-            months[key]["total_earnings"] += session.get("total_earnings", 0)
-        except ValueError:
-            continue
-    sorted_months = sorted(months.values(), key=lambda x: x["month"])
+def earnings_year(user_id: str = Depends(get_current_user)):
+    current_year = datetime.now().year
+    prev_year = current_year - 1
+    # Помесячные итоги за этот и прошлый год одним GROUP BY в SQLite
+    monthly = data_manager.get_monthly_totals(user_id, f"{prev_year}-01-01", f"{current_year}-12-31")
+    prefix = f"{current_year}-"
+    sorted_months = [
+        {"month": key, **totals}
+        for key, totals in sorted(monthly.items())
+        if key.startswith(prefix)
+    ]
     total_hours = sum(m["total_hours"] for m in sorted_months)
     total_earnings = sum(m["total_earnings"] for m in sorted_months)
-    prev_start = datetime(current_year - 1, 1, 1)
-    prev_end = datetime(current_year - 1, 12, 31, 23, 59, 59)
+    empty = {"total_hours": 0, "total_earnings": 0}
+    prev_series = [
+        {"month": f"{prev_year}-{m:02d}", **monthly.get(f"{prev_year}-{m:02d}", empty)}
+        for m in range(1, 13)
+    ]
     return {
         "year": current_year,
         "months": sorted_months,
         "total_hours": total_hours,
         "total_earnings": total_earnings,
-        "previous": _previous(
-            work_sessions,
-            prev_start,
-            prev_end,
-            "прошлый год",
-            series=_monthly_series(work_sessions, current_year - 1),
-        ),
+        "previous": {
+            "total_hours": sum(m["total_hours"] for m in prev_series),
+            "total_earnings": sum(m["total_earnings"] for m in prev_series),
+            "label": "прошлый год",
+            "series": prev_series,
+        },
     }
 
 
@@ -579,7 +569,7 @@ async def clickup_setup(body: ClickUpSetupRequest, user_id: str = Depends(get_cu
 
 
 @api.delete("/clickup/setup")
-async def clickup_reset(user_id: str = Depends(get_current_user)):
+def clickup_reset(user_id: str = Depends(get_current_user)):
     data_manager.clear_clickup_settings(user_id)
     return {"success": True}
 
@@ -588,6 +578,8 @@ async def clickup_reset(user_id: str = Depends(get_current_user)):
 async def clickup_sync(body: SyncRequest, user_id: str = Depends(get_current_user)):
     if data_manager.get_rate(user_id) <= 0:
         raise HTTPException(status_code=400, detail="Rate not set")
+    if body.days > MAX_SYNC_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be at most {MAX_SYNC_DAYS}")
 
     end_date = datetime.now()
     start_date = end_date - timedelta(days=max(1, body.days) - 1)
@@ -724,7 +716,7 @@ def _resolve_period(period: str, start: Optional[str], end: Optional[str]) -> tu
 
 
 @api.get("/analytics/tasks")
-async def analytics_tasks(
+def analytics_tasks(
     period: str = "week",
     start: Optional[str] = None,
     end: Optional[str] = None,
@@ -770,14 +762,14 @@ async def analytics_tasks(
 
 
 @api.get("/analytics/heatmap")
-async def analytics_heatmap(year: Optional[int] = None,
-                            user_id: str = Depends(get_current_user)):
+def analytics_heatmap(year: Optional[int] = None,
+                      user_id: str = Depends(get_current_user)):
     year = year or datetime.now().year
     return {"year": year, "days": data_manager.get_activity_heatmap(user_id, year)}
 
 
 @api.get("/analytics/projects")
-async def analytics_projects(
+def analytics_projects(
     period: str = "month",
     start: Optional[str] = None,
     end: Optional[str] = None,
@@ -797,7 +789,7 @@ async def analytics_projects(
 
 
 @api.get("/analytics/norm")
-async def analytics_norm(user_id: str = Depends(get_current_user)):
+def analytics_norm(user_id: str = Depends(get_current_user)):
     return data_manager.get_hours_norm_stats(user_id)
 
 
@@ -806,8 +798,8 @@ class HoursNormUpdate(BaseModel):
 
 
 @api.put("/user/hours-norm")
-async def update_hours_norm(body: HoursNormUpdate,
-                            user_id: str = Depends(get_current_user)):
+def update_hours_norm(body: HoursNormUpdate,
+                      user_id: str = Depends(get_current_user)):
     if body.hours < 0:
         raise HTTPException(status_code=400, detail="Hours norm must be non-negative")
     data_manager.set_hours_norm(user_id, body.hours)
@@ -55,7 +55,7 @@ async def backfill_user(dm: DataManager, user_id: str) -> int:
         print(f"[{user_id}] нечего заполнять")
         return 0
 
-    dates = [datetime.strptime(d, "%Y-%m-%d") for d, _ in pending]
+    dates = [datetime.fromisoformat(d) for d, _ in pending]
     start_date = min(dates).replace(hour=0, minute=0, second=0, microsecond=0)
     end_date = max(dates).replace(hour=23, minute=59, second=59) + timedelta(days=1)
 
@@ -96,6 +96,7 @@ async def main():
             total += await backfill_user(dm, user_id)
         except Exception as e:
             print(f"[{user_id}] ошибка backfill: {e!r} — пропуск пользователя")
+    await dm.close_clickup_clients()
     print(f"Готово. Всего обновлено: {total}." if total else "Изменений нет.")
 
 
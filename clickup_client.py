@@ -1,43 +1,183 @@
 import asyncio
+import concurrent.futures
 import logging
+import time
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 import aiohttp
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Таймаут по умолчанию для сессии (выгрузки записей и задач) и для коротких запросов
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=15)
+SHORT_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# Сколько секунд текущий таймер считается свежим в кэше клиента
+CURRENT_TIMER_TTL = 5
+
+# Общий лимит одновременных запросов к ClickUp для всех пользователей
+MAX_CONCURRENT_REQUESTS = 8
+# Дольше не ждём сброса лимита ClickUp, даже если заголовки просят больше
+MAX_RATE_LIMIT_WAIT = 60
+# Потолок экспоненциальной паузы между повторами
+MAX_BACKOFF = 30
+# Сколько байт тела ответа с ошибкой попадает в текст исключения и в лог
+MAX_ERROR_BODY = 500
+
+# Сбои, которые имеет смысл повторить: сетевые ошибки, 429/5xx и таймауты
+RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class RateLimitError(aiohttp.ClientError):
+    """HTTP 429 от ClickUp; retry_after — сколько секунд ждать перед повтором"""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("Превышен лимит запросов API")
+        self.retry_after = retry_after
+
 
 async def retry_with_backoff(func, max_retries=3, backoff_factor=1):
     """Retry decorator with exponential backoff"""
     for attempt in range(max_retries):
         try:
             return await func()
-        except aiohttp.ClientError as e:
+        except RETRYABLE_ERRORS as e:
             if attempt == max_retries - 1:
-                raise e
-            wait_time = backoff_factor * (2 ** attempt)
-            logger.warning(f"Attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
+                raise
+            wait_time = min(backoff_factor * (2 ** attempt), MAX_BACKOFF)
+            if isinstance(e, RateLimitError) and e.retry_after is not None:
+                wait_time = max(wait_time, min(e.retry_after, MAX_RATE_LIMIT_WAIT))
+            logger.warning("Attempt %d failed, retrying in %ss: %r", attempt + 1, wait_time, e)
             await asyncio.sleep(wait_time)
-        except Exception as e:
-            raise e
+
+
+async def _http_error(response: aiohttp.ClientResponse) -> Exception:
+    """Ошибка для неожиданного статуса ClickUp с началом тела ответа
+    (страницы 5xx бывают большими — читаем только первые MAX_ERROR_BODY байт, не буферизуя всё тело).
+
+    5xx — ClientError, её повторит retry_with_backoff; прочие 4xx — ValueError,
+    как 401/403: повтор дал бы тот же ответ и только потратил бы лимит."""
+    body = (await response.content.read(MAX_ERROR_BODY)).decode("utf-8", errors="replace")
+    message = f"HTTP {response.status}: {body}"
+    if response.status >= 500:
+        return aiohttp.ClientError(message)
+    return ValueError(message)
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Пауза после 429: Retry-After, а без него — время до X-RateLimit-Reset"""
+    retry_after = headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    try:
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0.0)
+    except (KeyError, ValueError):
+        return None
+
+
+# Семафор привязывается к циклу, в котором впервые заблокировал ожидающего, а бот,
+# API, backfill и тесты работают в разных циклах — поэтому свой семафор на каждый цикл
+_loop_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _request_semaphore() -> asyncio.Semaphore:
+    """Общий для всех клиентов лимит одновременных запросов в текущем event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _loop_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return semaphore
+
+
+def _rate_limit_delay(headers) -> float:
+    """Сколько ждать до сброса лимита, если по заголовкам ClickUp запросов не осталось"""
+    if headers.get("X-RateLimit-Remaining") != "0":
+        return 0.0
+    try:
+        reset = float(headers["X-RateLimit-Reset"])
+    except (KeyError, ValueError):
+        return 0.0
+    return min(max(reset - time.time(), 0.0), MAX_RATE_LIMIT_WAIT)
 
 
 class ClickUpClient:
     """Клиент для работы с ClickUp API"""
 
-    def __init__(self, api_token: str, workspace_id: str):
+    def __init__(self, api_token: str, workspace_id: str, team_id: Optional[str] = None):
         self.api_token = api_token
         self.workspace_id = workspace_id
         self.base_url = "https://api.clickup.com/api/v2"
-        self.team_id = None
-
-    def _get_headers(self) -> Dict[str, str]:
-        """Получение заголовков для API запросов"""
-        return {
-            "Authorization": self.api_token,
+        # team_id из сохранённых настроек избавляет от запроса /team после перезапуска
+        self.team_id = team_id
+        self._timer_cache: Optional[Tuple[float, Optional[Dict]]] = None
+        self._headers = {
+            "Authorization": api_token,
             "Content-Type": "application/json"
         }
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Цикл, в котором создана сессия: закрывать её можно только в нём
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия клиента: соединения с api.clickup.com переиспользуются (keep-alive)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=32, limit_per_host=16, keepalive_timeout=75, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+            self._session_loop = asyncio.get_running_loop()
+        return self._session
+
+    def invalidate_cache(self) -> None:
+        """Сброс кэша текущего таймера"""
+        self._timer_cache = None
+
+    @asynccontextmanager
+    async def _request(self, method: str, url: str, **kwargs):
+        """HTTP-запрос под общим семафором с учётом лимитов ClickUp.
+
+        Если лимит исчерпан, слот семафора держится до X-RateLimit-Reset,
+        чтобы остальные запросы не упирались в 429."""
+        session = await self._get_session()
+        async with _request_semaphore():
+            async with session.request(method, url, headers=self._headers, **kwargs) as response:
+                logger.debug("ClickUp API %s %s -> %s", method, url, response.status)
+                if response.status == 429:
+                    raise RateLimitError(_retry_after(response.headers))
+                yield response
+            delay = _rate_limit_delay(response.headers)
+            if delay:
+                logger.warning("ClickUp rate limit reached, waiting %.1fs", delay)
+                await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        """Закрытие HTTP-сессии клиента"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def close_soon(self) -> Optional[Union[asyncio.Task, concurrent.futures.Future]]:
+        """Закрытие сессии из синхронного кода: close() планируется в цикле, где сессия
+        создана (из другого потока — через run_coroutine_threadsafe).
+
+        Возвращает задачу или future — вызывающий должен держать ссылку, пока она
+        не завершится; None, если закрывать нечего."""
+        loop = self._session_loop
+        if self._session is None or self._session.closed or loop is None or loop.is_closed():
+            return None
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return loop.create_task(self.close())
+        return asyncio.run_coroutine_threadsafe(self.close(), loop)
 
     async def get_team_id(self) -> Optional[str]:
         """Получение team_id из workspace_id"""
@@ -45,38 +185,28 @@ class ClickUpClient:
             return self.team_id
 
         async def _fetch_team_id():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/team"
-                headers = self._get_headers()
-                logger.info(f"ClickUp API request: GET {url}")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        teams = data.get('teams', [])
-                        logger.info(f"Available teams: {[team.get('id') for team in teams]}")
-                        logger.info(f"Looking for workspace_id: {self.workspace_id}")
-
-                        for team in teams:
-                            if team.get('id') == self.workspace_id:
-                                self.team_id = self.workspace_id
-                                logger.info(f"Found matching team_id: {self.team_id}")
-                                return self.team_id
-                        if teams:
-                            self.team_id = teams[0]['id']
-                            logger.info(f"Using first available team_id: {self.team_id}")
-                            return self.team_id
-                        logger.warning("No teams available")
-                    elif response.status == 401:
-                        raise ValueError("Неверный API токен ClickUp")
-                    elif response.status == 403:
-                        raise ValueError("Нет доступа к API ClickUp")
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
-                    return None
+            url = f"{self.base_url}/team"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    teams = data.get('teams', [])
+
+                    matched = next((t for t in teams if t.get('id') == self.workspace_id), None)
+                    if matched is None and teams:
+                        matched = teams[0]
+                        logger.debug("Workspace %s not found, using first team", self.workspace_id)
+                    if matched is not None:
+                        self.team_id = matched['id']
+                        return self.team_id
+                    logger.warning("No teams available")
+                elif response.status == 401:
+                    raise ValueError("Неверный API токен ClickUp")
+                elif response.status == 403:
+                    raise ValueError("Нет доступа к API ClickUp")
+                else:
+                    raise await _http_error(response)
+                return None
 
         try:
             result = await retry_with_backoff(_fetch_team_id)
@@ -85,80 +215,86 @@ class ClickUpClient:
             logger.error(f"Ошибка получения team_id: {e}")
             return None
 
-    async def get_time_entries(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """Получение записей времени за указанный период"""
+    async def get_time_entries(self, start_date: datetime, end_date: datetime,
+                               raise_errors: bool = False) -> List[Dict]:
+        """Получение записей времени за указанный период.
+        С raise_errors ошибка пробрасывается, а не превращается в пустой список."""
         team_id = await self.get_team_id()
         if not team_id:
             return []
 
+        start_ms = int(start_date.timestamp() * 1000)
+        end_ms = int(end_date.timestamp() * 1000)
+
         async def _fetch_time_entries():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-                url = f"{self.base_url}/team/{team_id}/time_entries"
-                params = {
-                    'start_date': int(start_date.timestamp() * 1000),
-                    'end_date': int(end_date.timestamp() * 1000)
-                }
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
-                logger.info(f"Params: {params}")
-
-                async with session.get(url, headers=headers, params=params) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-                    logger.info(f"Response body length: {len(response_text)}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        entries = data.get('data', [])
-                        logger.info(f"Retrieved {len(entries)} time entries")
-                        return entries
-                    elif response.status == 401:
+            url = f"{self.base_url}/team/{team_id}/time_entries"
+            params = {'start_date': start_ms, 'end_date': end_ms}
+
+            async with self._request("GET", url, params=params) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    entries = data.get('data', [])
+                    logger.debug("Retrieved %d time entries", len(entries))
+                    return entries
+                elif response.status in (401, 403):
+                    # team_id мог устареть (доступ к команде отозван) — в следующий раз определим заново
+                    self.team_id = None
+                    if response.status == 401:
                         raise ValueError("Неверный API токен ClickUp")
-                    elif response.status == 403:
-                        raise ValueError("Нет доступа к записям времени")
-                    elif response.status == 429:
-                        raise aiohttp.ClientError("Превышен лимит запросов API")
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+                    raise ValueError("Нет доступа к записям времени")
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_time_entries)
         except Exception as e:
             logger.error(f"Ошибка получения записей времени: {e}")
+            if raise_errors:
+                raise
             return []
 
     async def get_current_timer(self) -> Optional[Dict]:
         """Получение текущего запущенного таймера (запись с отрицательной продолжительностью)"""
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=1)
+        if self._timer_cache and time.monotonic() - self._timer_cache[0] < CURRENT_TIMER_TTL:
+            return self._timer_cache[1]
 
-        entries = await self.get_time_entries(start_date, end_date)
-        for entry in entries:
-            if int(entry.get('duration', 0)) < 0:
-                return entry
-        return None
+        team_id = await self.get_team_id()
+        if not team_id:
+            return None
+
+        async def _fetch_current():
+            url = f"{self.base_url}/team/{team_id}/time_entries/current"
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    return data.get('data') or None
+                raise await _http_error(response)
+
+        try:
+            timer = await retry_with_backoff(_fetch_current)
+        except Exception as e:
+            # Запасной путь: ищем запущенную запись среди записей за сутки
+            logger.warning("Ошибка получения текущего таймера, ищу в записях за сутки: %s", e)
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=1)
+            entries = await self.get_time_entries(start_date, end_date)
+            timer = next((entry for entry in entries if int(entry.get('duration', 0)) < 0), None)
+        self._timer_cache = (time.monotonic(), timer)
+        return timer
 
     async def get_current_user(self) -> Optional[Dict]:
         """Получение информации о текущем пользователе"""
         async def _fetch_user():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/user"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        user_data = await response.json()
-                        user = user_data.get('user', {})
-                        logger.info(f"Retrieved current user: {user.get('username', 'Unknown')}")
-                        return user
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/user"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    user_data = orjson.loads(await response.read())
+                    user = user_data.get('user', {})
+                    logger.debug("Retrieved current user: %s", user.get('username', 'Unknown'))
+                    return user
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_user)
@@ -173,23 +309,16 @@ class ClickUpClient:
             return []
 
         async def _fetch_spaces():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/team/{team_id}/space"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        spaces = data.get('spaces', [])
-                        logger.info(f"Retrieved {len(spaces)} spaces")
-                        return spaces
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/team/{team_id}/space"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    spaces = data.get('spaces', [])
+                    logger.debug("Retrieved %d spaces", len(spaces))
+                    return spaces
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_spaces)
@@ -200,23 +329,16 @@ class ClickUpClient:
     async def get_folders(self, space_id: str) -> List[Dict]:
         """Получение списка папок в пространстве"""
         async def _fetch_folders():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/space/{space_id}/folder"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        folders = data.get('folders', [])
-                        logger.info(f"Retrieved {len(folders)} folders")
-                        return folders
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/space/{space_id}/folder"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    folders = data.get('folders', [])
+                    logger.debug("Retrieved %d folders", len(folders))
+                    return folders
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_folders)
@@ -227,27 +349,19 @@ class ClickUpClient:
     async def get_lists(self, space_id: str, folder_id: str = None) -> List[Dict]:
         """Получение списков в пространстве или папке"""
         async def _fetch_lists():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                if folder_id:
-                    url = f"{self.base_url}/folder/{folder_id}/list"
+            if folder_id:
+                url = f"{self.base_url}/folder/{folder_id}/list"
+            else:
+                url = f"{self.base_url}/space/{space_id}/list"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    lists = data.get('lists', [])
+                    logger.debug("Retrieved %d lists", len(lists))
+                    return lists
                 else:
-                    url = f"{self.base_url}/space/{space_id}/list"
-
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        lists = data.get('lists', [])
-                        logger.info(f"Retrieved {len(lists)} lists")
-                        return lists
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_lists)
@@ -258,20 +372,13 @@ class ClickUpClient:
     async def get_list(self, list_id: str) -> Optional[Dict]:
         """Получение информации о списке (проекте) по его id"""
         async def _fetch_list():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/list/{list_id}"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
+            url = f"{self.base_url}/list/{list_id}"
 
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    return orjson.loads(await response.read())
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_list)
@@ -282,28 +389,20 @@ class ClickUpClient:
     async def get_tasks(self, list_id: str, assignee_id: str = None) -> List[Dict]:
         """Получение задач из списка"""
         async def _fetch_tasks():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-                url = f"{self.base_url}/list/{list_id}/task"
-                headers = self._get_headers()
-                params = {}
-
-                if assignee_id:
-                    params['assignees[]'] = assignee_id
-
-                logger.info(f"ClickUp API request: GET {url}")
-                logger.info(f"Params: {params}")
-
-                async with session.get(url, headers=headers, params=params) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        tasks = data.get('tasks', [])
-                        logger.info(f"Retrieved {len(tasks)} tasks")
-                        return tasks
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/list/{list_id}/task"
+            params = {}
+
+            if assignee_id:
+                params['assignees[]'] = assignee_id
+
+            async with self._request("GET", url, params=params) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    tasks = data.get('tasks', [])
+                    logger.debug("Retrieved %d tasks", len(tasks))
+                    return tasks
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_tasks)
@@ -314,22 +413,15 @@ class ClickUpClient:
     async def get_task_details(self, task_id: str) -> Optional[Dict]:
         """Получение подробной информации о задаче"""
         async def _fetch_task():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/task/{task_id}"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url}")
+            url = f"{self.base_url}/task/{task_id}"
 
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        task = await response.json()
-                        logger.info(f"Retrieved task details: {task.get('name', 'Unknown')}")
-                        return task
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    task = orjson.loads(await response.read())
+                    logger.debug("Retrieved task details: %s", task.get('name', 'Unknown'))
+                    return task
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_task)
@@ -340,23 +432,15 @@ class ClickUpClient:
     async def update_task_status(self, task_id: str, status: str) -> bool:
         """Обновление статуса задачи"""
         async def _update_status():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/task/{task_id}"
-                headers = self._get_headers()
-                data = {"status": status}
+            url = f"{self.base_url}/task/{task_id}"
+            data = {"status": status}
 
-                logger.info(f"ClickUp API request: PUT {url}")
-                logger.info(f"Data: {data}")
-
-                async with session.put(url, headers=headers, json=data) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        logger.info(f"Task status updated to: {status}")
-                        return True
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            async with self._request("PUT", url, json=data, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    logger.info("Task %s status updated to: %s", task_id, status)
+                    return True
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_update_status)
@@ -371,23 +455,16 @@ class ClickUpClient:
             return False
 
         async def _start_timer():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/team/{team_id}/time_entries/start"
-                headers = self._get_headers()
-                data = {"tid": task_id}
-
-                logger.info(f"ClickUp API request: POST {url}")
-                logger.info(f"Data: {data}")
-
-                async with session.post(url, headers=headers, json=data) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        logger.info(f"Timer started for task: {task_id}")
-                        return True
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/team/{team_id}/time_entries/start"
+            data = {"tid": task_id}
+
+            async with self._request("POST", url, json=data, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    logger.info("Timer started for task: %s", task_id)
+                    self.invalidate_cache()
+                    return True
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_start_timer)
@@ -402,21 +479,15 @@ class ClickUpClient:
             return False
 
         async def _stop_timer():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/team/{team_id}/time_entries/stop"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: POST {url}")
+            url = f"{self.base_url}/team/{team_id}/time_entries/stop"
 
-                async with session.post(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        logger.info("Timer stopped")
-                        return True
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            async with self._request("POST", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    logger.info("Timer stopped")
+                    self.invalidate_cache()
+                    return True
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_stop_timer)
@@ -425,66 +496,64 @@ class ClickUpClient:
             return False
 
     async def get_user_tasks(self, assignee_id: str = None) -> List[Dict]:
-        """Получение всех задач пользователя из всех списков"""
-        all_tasks = []
+        """Получение всех задач пользователя из всех списков.
 
+        Пространства, папки и списки запрашиваются параллельно; число
+        одновременных запросов ограничивает общий семафор в _request."""
         spaces = await self.get_spaces()
-
-        for space in spaces:
-            space_id = space.get('id')
-
-            lists = await self.get_lists(space_id)
-
-            folders = await self.get_folders(space_id)
-            for folder in folders:
-                folder_lists = await self.get_lists(space_id, folder.get('id'))
-                lists.extend(folder_lists)
-
-            for list_item in lists:
-                list_id = list_item.get('id')
-                tasks = await self.get_tasks(list_id, assignee_id)
-
-                for task in tasks:
-                    task['project_name'] = space.get('name', 'Unknown Project')
-                    task['list_name'] = list_item.get('name', 'Unknown List')
-
-                all_tasks.extend(tasks)
-
+        per_space = await asyncio.gather(
+            *(self._get_space_tasks(space, assignee_id) for space in spaces)
+        )
+        return [task for tasks in per_space for task in tasks]
+
+    async def _get_space_tasks(self, space: Dict, assignee_id: Optional[str]) -> List[Dict]:
+        """Задачи из всех списков одного пространства (в корне и в папках)"""
+        space_id = space.get('id')
+        lists, folders = await asyncio.gather(self.get_lists(space_id), self.get_folders(space_id))
+        folder_lists = await asyncio.gather(
+            *(self.get_lists(space_id, folder.get('id')) for folder in folders)
+        )
+        for extra in folder_lists:
+            lists.extend(extra)
+
+        tasks_per_list = await asyncio.gather(
+            *(self.get_tasks(list_item.get('id'), assignee_id) for list_item in lists)
+        )
+
+        project_name = space.get('name', 'Unknown Project')
+        all_tasks = []
+        for list_item, tasks in zip(lists, tasks_per_list):
+            list_name = list_item.get('name', 'Unknown List')
+            for task in tasks:
+                task['project_name'] = project_name
+                task['list_name'] = list_name
+            all_tasks.extend(tasks)
         return all_tasks
 
     async def get_list_statuses(self, list_id: str) -> List[Dict]:
         """Получение доступных статусов для конкретного списка"""
         async def _fetch_statuses():
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                url = f"{self.base_url}/list/{list_id}"
-                headers = self._get_headers()
-
-                logger.info(f"ClickUp API request: GET {url} (для получения статусов)")
-
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"ClickUp API response: {response.status}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        statuses = data.get('statuses', [])
-                        logger.info(f"Получено статусов: {len(statuses)}")
-                        logger.info(f"Сырые данные статусов из API: {statuses}")
-
-                        formatted_statuses = []
-                        for status in statuses:
-                            status_name = status.get('status', 'Unknown')
-                            formatted_status = {
-                                'key': status_name.lower(),
-                                'name': status_name,
-                                'color': status.get('color', '#000000')
-                            }
-                            formatted_statuses.append(formatted_status)
-                            logger.info(f"Отформатирован статус: {formatted_status}")
-
-                        return formatted_statuses
-                    else:
-                        raise aiohttp.ClientError(f"HTTP {response.status}: {response_text}")
+            url = f"{self.base_url}/list/{list_id}"
+
+            async with self._request("GET", url, timeout=SHORT_TIMEOUT) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    statuses = data.get('statuses', [])
+                    logger.debug("Получено статусов: %d", len(statuses))
+
+                    formatted_statuses = []
+                    for status in statuses:
+                        status_name = status.get('status', 'Unknown')
+                        formatted_status = {
+                            'key': status_name.lower(),
+                            'name': status_name,
+                            'color': status.get('color', '#000000')
+                        }
+                        formatted_statuses.append(formatted_status)
+
+                    return formatted_statuses
+                else:
+                    raise await _http_error(response)
 
         try:
             return await retry_with_backoff(_fetch_statuses)
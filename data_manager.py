@@ -1,7 +1,11 @@
+import asyncio
+import calendar
 import logging
+import re
 import threading
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 
 import crypto
 import db
@@ -12,6 +16,13 @@ logger = logging.getLogger(__name__)
 
 DB_FILE = "salary.db"
 MS_PER_HOUR = 3_600_000
+ONE_DAY = timedelta(days=1)
+# Длинные окна синхронизации запрашиваются у ClickUp параллельно кусками не длиннее этого:
+# /synclast 30 — пять запросов, а не тридцать
+SYNC_WINDOW = timedelta(days=7)
+# Больше дней за одну синхронизацию не запрашиваем (бот и вебапп)
+MAX_SYNC_DAYS = 30
+SYNCED_IDS_BATCH = 500
 
 _CLICKUP_KEYS = ("api_token", "workspace_id", "team_id", "user_id", "username")
 
@@ -19,6 +30,127 @@ _NOTIFICATION_COLUMNS = (
     "notify_daily_digest", "digest_time", "notify_weekly",
     "notify_long_timer", "long_timer_hours", "autosync_enabled",
 )
+_HHMM_RE = re.compile(r"([0-9]+):([0-9]+)")
+
+# Индекс — номер месяца (date.month), нулевой элемент — заглушка
+_RU_MONTHS = (
+    "", "январь", "февраль", "март", "апрель", "май", "июнь",
+    "июль", "август", "сентябрь", "октябрь", "ноябрь", "декабрь",
+)
+# Подписи месяцев для разбивок вебаппа (с заглавной), индекс — date.month
+_RU_MONTHS_TITLE = tuple(m.capitalize() for m in _RU_MONTHS)
+
+# Индекс — date.weekday()
+_DAYS_RU = ("Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье")
+_DAYS_RU_SHORT = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+# Отчёт за один день (сегодня/вчера): шаблон разбирается один раз при импорте
+_DAY_REPORT = (
+    "📊 Заработок за {label} ({day:%d.%m.%Y}):\n\n"
+    "⏰ Отработано: {time}\n"
+    "💰 Заработано: {earnings:.2f} руб"
+).format
+
+
+@lru_cache(maxsize=400)
+def _day_key(ordinal: int) -> str:
+    """Ключ дня 'YYYY-MM-DD' по date.toordinal(); отчёты ходят по одним и тем же дням."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+@lru_cache(maxsize=256)
+def _russian_month_year(year: int, month: int) -> str:
+    """'июль 2026' — заголовки месячных и годовых отчётов."""
+    return f"{_RU_MONTHS[month]} {year}"
+
+
+def _fmt_dm(day) -> str:
+    """ДД.ММ без strftime — подписи дней в отчётах строятся в циклах."""
+    return f"{day.day:02d}.{day.month:02d}"
+
+
+def parse_hhmm(value: str) -> Optional[Tuple[int, int]]:
+    """(часы, минуты) из 'ЧЧ:ММ' или None — общая проверка digest_time для бота и API."""
+    m = _HHMM_RE.fullmatch(value)
+    if not m:
+        return None
+    hours, minutes = int(m.group(1)), int(m.group(2))
+    if hours > 23 or minutes > 59:
+        return None
+    return hours, minutes
+
+
+def earnings_period_start(report_type: str, today: date) -> str:
+    """Первый день, нужный отчёту о заработке: более ранние итоги из SQLite не читаем."""
+    if report_type == "today":
+        start = today
+    elif report_type == "yesterday":
+        start = today - timedelta(days=1)
+    elif report_type in ("week", "week_details"):
+        start = today - timedelta(days=today.weekday())
+    elif report_type in ("month", "month_weeks"):
+        start = today.replace(day=1)
+    elif report_type == "prev_month_weeks":
+        start = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+    else:
+        start = today.replace(month=1, day=1)
+    return start.isoformat()
+
+
+def _sum_range(work_sessions: Dict[str, Any], first_ordinal: int,
+               last_ordinal: int) -> tuple:
+    """(часы, заработок, рабочих дней) за дни first..last включительно.
+    Обходим только пересечение с ключами — дни без работы не трогаем."""
+    wanted = {_day_key(o) for o in range(first_ordinal, last_ordinal + 1)}
+    hours = earnings = 0
+    worked_days = sorted(wanted & work_sessions.keys())
+    for date_str in worked_days:
+        session = work_sessions[date_str]
+        hours += session["total_hours"]
+        earnings += session["total_earnings"]
+    return hours, earnings, len(worked_days)
+
+
+def _month_weeks(work_sessions: Dict[str, Any], first: date, last: date) -> tuple:
+    """Недели месяца с работой за дни first..last (first — 1-е число) и итоги за период.
+    Неделя 1 — от 1-го числа до первого воскресенья, дальше пн–вс.
+    Дни раскладываются по неделям за один проход по ключам, без обхода календаря."""
+    offset = first.weekday()
+    first_key, last_key = first.isoformat(), last.isoformat()
+    buckets: Dict[int, list] = {}
+    for date_str in sorted(k for k in work_sessions if first_key <= k <= last_key):
+        session = work_sessions[date_str]
+        bucket = buckets.setdefault((int(date_str[8:10]) + offset - 1) // 7 + 1, [0, 0])
+        bucket[0] += session["total_hours"]
+        bucket[1] += session["total_earnings"]
+
+    weeks_data = []
+    total_hours = total_earnings = 0
+    for number, (hours, earnings) in sorted(buckets.items()):
+        if hours <= 0:
+            continue
+        start = first if number == 1 else first + timedelta(days=7 * (number - 1) - offset)
+        weeks_data.append({
+            'number': number,
+            'start': start,
+            'end': min(first + timedelta(days=7 * number - offset - 1), last),
+            'hours': hours,
+            'earnings': earnings,
+        })
+        total_hours += hours
+        total_earnings += earnings
+    return weeks_data, total_hours, total_earnings
+
+
+@lru_cache(maxsize=1024)
+def _fmt_hm(total_hours: float) -> str:
+    """'Xч Yм' по часам; одни и те же итоги выводятся в нескольких отчётах подряд.
+    Минуты округляются: часы из SQL (мс / MS_PER_HOUR) и из суммы сессий могут
+    разойтись в последнем знаке, и отсечение дало бы 14ч 43м вместо 14ч 44м."""
+    hours, minutes = divmod(round(total_hours * 60), 60)
+    if minutes == 0:
+        return f"{hours}ч"
+    return f"{hours}ч {minutes}м"
 
 
 class DataManager:
@@ -28,6 +160,13 @@ class DataManager:
         self.db_path = db_path
         self.conn = db.get_connection(db_path)
         self._lock = threading.Lock()
+        # user_id -> ClickUpClient: одна HTTP-сессия на пользователя вместо новой на каждый запрос
+        self._clickup_clients: Dict[str, ClickUpClient] = {}
+        # Незавершённые закрытия сессий выбывших клиентов (ссылки, чтобы задачи не собрал GC)
+        self._closing_clients: set = set()
+        # user_id -> расшифрованные настройки ClickUp; сбрасывается при каждой записи настроек
+        self._clickup_settings: Dict[str, Dict[str, Any]] = {}
+        self._sync_locks: Dict[str, asyncio.Lock] = {}
         crypto.get_fernet()  # fail fast at startup if ENCRYPTION_KEY is missing/invalid
 
     def ensure_user(self, user_id: str) -> None:
@@ -45,11 +184,18 @@ class DataManager:
 
     def get_clickup_settings(self, user_id: str) -> Dict[str, Any]:
         with self._lock:
-            row = self.conn.execute(
-                "SELECT clickup_api_token, clickup_workspace_id, clickup_team_id, "
-                "clickup_user_id, clickup_username FROM users WHERE user_id = ?",
-                (user_id,),
-            ).fetchone()
+            settings = self._clickup_settings.get(user_id)
+            if settings is None:
+                settings = self._read_clickup_settings(user_id)
+                self._clickup_settings[user_id] = settings
+        return dict(settings)
+
+    def _read_clickup_settings(self, user_id: str) -> Dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT clickup_api_token, clickup_workspace_id, clickup_team_id, "
+            "clickup_user_id, clickup_username FROM users WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
         if not row:
             return {k: None for k in _CLICKUP_KEYS}
         token = row["clickup_api_token"]
@@ -61,24 +207,29 @@ class DataManager:
             "username": row["clickup_username"],
         }
 
-    def get_work_sessions(self, user_id: str) -> Dict[str, Any]:
+    def get_work_sessions(self, user_id: str, start_date: Optional[str] = None,
+                          end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Сессии по дням; с границами дат отдельные сессии собираются только за этот период."""
+        query = ("SELECT date, duration_ms, earnings, timestamp, source, clickup_id, "
+                 "task_name, project_name, description FROM work_sessions WHERE user_id = ?")
+        params: List[Any] = [user_id]
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        query += " ORDER BY id"
         with self._lock:
-            cur = self.conn.execute(
-                "SELECT date, duration_ms, earnings, timestamp, source, clickup_id, "
-                "task_name, project_name, description FROM work_sessions "
-                "WHERE user_id = ? ORDER BY id",
-                (user_id,),
-            )
+            cur = self.conn.execute(query, params)
             result: Dict[str, Any] = {}
             for row in cur:
                 day = result.setdefault(
                     row["date"], {"total_hours": 0.0, "total_earnings": 0.0, "sessions": []}
                 )
                 ms = row["duration_ms"]
-                duration_hours = ms / MS_PER_HOUR
                 day["sessions"].append({
                     "duration_ms": ms,
-                    "duration_hours": duration_hours,
                     "hours": ms // MS_PER_HOUR,
                     "minutes": (ms % MS_PER_HOUR) // 60_000,
                     "earnings": row["earnings"],
@@ -89,10 +240,44 @@ class DataManager:
                     "project_name": row["project_name"],
                     "description": row["description"],
                 })
-                day["total_hours"] += duration_hours
+                day["total_hours"] += ms / MS_PER_HOUR
                 day["total_earnings"] += row["earnings"]
         return result
 
+    def get_daily_totals(self, user_id: str, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Итоги по дням {date: {total_hours, total_earnings}}, посчитанные в SQLite.
+        Для отчётов, которым не нужны отдельные сессии."""
+        return self._grouped_totals(user_id, "date", start_date, end_date)
+
+    def get_monthly_totals(self, user_id: str, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Итоги по месяцам {'YYYY-MM': {total_hours, total_earnings}} — для годовых отчётов,
+        чтобы не тянуть и не разбирать каждый день года."""
+        return self._grouped_totals(user_id, "substr(date, 1, 7)", start_date, end_date)
+
+    def _grouped_totals(self, user_id: str, period_expr: str, start_date: Optional[str],
+                        end_date: Optional[str]) -> Dict[str, Dict[str, float]]:
+        query = (f"SELECT {period_expr} AS period, SUM(duration_ms) AS ms, "
+                 "SUM(earnings) AS earnings FROM work_sessions WHERE user_id = ?")
+        params: List[Any] = [user_id]
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        query += " GROUP BY period"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return {
+            row["period"]: {
+                "total_hours": row["ms"] / MS_PER_HOUR,
+                "total_earnings": row["earnings"],
+            }
+            for row in rows
+        }
+
     def is_entry_synced(self, user_id: str, entry_id: str) -> bool:
         with self._lock:
             row = self.conn.execute(
@@ -101,6 +286,22 @@ class DataManager:
             ).fetchone()
         return row is not None
 
+    def get_synced_entry_ids(self, user_id: str, entry_ids) -> set:
+        """Какие из entry_ids уже синхронизированы — без загрузки всей истории пользователя."""
+        entry_ids = list(entry_ids)
+        found = set()
+        with self._lock:
+            # Пачками: у старых сборок SQLite не больше 999 параметров на запрос
+            for i in range(0, len(entry_ids), SYNCED_IDS_BATCH):
+                batch = entry_ids[i:i + SYNCED_IDS_BATCH]
+                cur = self.conn.execute(
+                    "SELECT entry_id FROM synced_entries WHERE user_id = ? AND entry_id IN "
+                    f"({','.join('?' * len(batch))})",
+                    (user_id, *batch),
+                )
+                found.update(row[0] for row in cur)
+        return found
+
     def count_synced_entries(self, user_id: str) -> int:
         with self._lock:
             row = self.conn.execute(
@@ -139,6 +340,7 @@ class DataManager:
             self.conn.execute(
                 f"UPDATE users SET {', '.join(assignments)} WHERE user_id = ?", values
             )
+            self._clickup_settings.pop(user_id, None)
 
     def clear_clickup_settings(self, user_id: str) -> None:
         self.ensure_user(user_id)
@@ -149,6 +351,10 @@ class DataManager:
                 "WHERE user_id = ?",
                 (user_id,),
             )
+            self._clickup_settings.pop(user_id, None)
+        client = self._clickup_clients.pop(user_id, None)
+        if client is not None:
+            self._retire_clickup_client(client)
 
     def get_monthly_goal(self, user_id: str) -> float:
         self.ensure_user(user_id)
@@ -213,16 +419,13 @@ class DataManager:
         now = now or datetime.now()
         month_prefix = now.strftime("%Y-%m")
         first_day = f"{month_prefix}-01"
-        if now.month == 12:
-            last_dom = 31
-        else:
-            last_dom = (now.replace(day=1, month=now.month + 1) - timedelta(days=1)).day
+        last_dom = calendar.monthrange(now.year, now.month)[1]
         last_day = f"{month_prefix}-{last_dom:02d}"
 
-        hours_earnings = 0.0
-        for date_str, day in self.get_work_sessions(user_id).items():
-            if date_str.startswith(month_prefix):
-                hours_earnings += day["total_earnings"]
+        hours_earnings = sum(
+            day["total_earnings"]
+            for day in self.get_daily_totals(user_id, first_day, last_day).values()
+        )
 
         bonus_earnings = self.sum_bonuses(user_id, first_day, last_day)
         goal = self.get_monthly_goal(user_id)
@@ -267,11 +470,9 @@ class DataManager:
 
     def get_activity_heatmap(self, user_id: str, year: int) -> List[Dict[str, Any]]:
         """Дни года с активностью: часы, заработок и уровень интенсивности 0–4."""
-        prefix = f"{year}-"
+        totals = self.get_daily_totals(user_id, f"{year}-01-01", f"{year}-12-31")
         out = []
-        for date_str, day in sorted(self.get_work_sessions(user_id).items()):
-            if not date_str.startswith(prefix):
-                continue
+        for date_str, day in sorted(totals.items()):
             hours = day["total_hours"]
             out.append({
                 "date": date_str,
@@ -284,17 +485,18 @@ class DataManager:
     def get_projects_breakdown(self, user_id: str, start_date: datetime,
                                end_date: datetime) -> List[Dict[str, Any]]:
         """Время/деньги по проектам за период, сортировка по заработку."""
-        start = start_date.strftime("%Y-%m-%d")
-        end = end_date.strftime("%Y-%m-%d")
-        totals: Dict[str, Dict[str, float]] = {}
-        for date_str, day in self.get_work_sessions(user_id).items():
-            if not (start <= date_str <= end):
-                continue
-            for session in day["sessions"]:
-                name = session.get("project_name") or "Без проекта"
-                agg = totals.setdefault(name, {"hours": 0.0, "earnings": 0.0})
-                agg["hours"] += session["duration_hours"]
-                agg["earnings"] += session["earnings"]
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT COALESCE(NULLIF(project_name, ''), 'Без проекта') AS name, "
+                "SUM(duration_ms) AS ms, SUM(earnings) AS earnings FROM work_sessions "
+                "WHERE user_id = ? AND date >= ? AND date <= ? "
+                "GROUP BY name ORDER BY MIN(id)",
+                (user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+            ).fetchall()
+        totals = {
+            row["name"]: {"hours": row["ms"] / MS_PER_HOUR, "earnings": row["earnings"]}
+            for row in rows
+        }
         grand_total = sum(v["earnings"] for v in totals.values())
         items = [
             {
@@ -322,9 +524,8 @@ class DataManager:
         month_prefix = now.strftime("%Y-%m")
 
         actual_hours = 0.0
-        for date_str, day in self.get_work_sessions(user_id).items():
-            if date_str.startswith(month_prefix):
-                actual_hours += day["total_hours"]
+        for day in self.get_daily_totals(user_id, f"{month_prefix}-01", f"{month_prefix}-31").values():
+            actual_hours += day["total_hours"]
 
         expected = None
         if norm > 0:
@@ -393,147 +594,113 @@ class DataManager:
                            session: Dict[str, Any]) -> bool:
         """Атомарно: пометить запись синхронизированной И вставить сессию.
         Возвращает True, если сессия добавлена (запись была новой)."""
+        return self.add_synced_sessions(user_id, [(entry_id, date, session)])[0]
+
+    def add_synced_sessions(self, user_id: str,
+                            items: List[tuple]) -> List[bool]:
+        """Пакетный вариант add_synced_session: все (entry_id, day, session)
+        одной транзакцией, чтобы синк не платил за коммит на каждую запись.
+        Возвращает флаги «добавлена» в порядке items."""
         self.ensure_user(user_id)
+        added: List[bool] = []
         with self._lock:
             self.conn.execute("BEGIN IMMEDIATE")
             try:
-                cur = self.conn.execute(
-                    "INSERT OR IGNORE INTO synced_entries (user_id, entry_id) VALUES (?, ?)",
-                    (user_id, entry_id),
-                )
-                if cur.rowcount != 1:
-                    self.conn.execute("ROLLBACK")
-                    return False
-                self.conn.execute(
-                    "INSERT INTO work_sessions (user_id, date, duration_ms, earnings, "
-                    "timestamp, source, clickup_id, task_name, project_name, description) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        user_id,
-                        date,
-                        int(session.get("duration_ms", 0)),
-                        float(session.get("earnings", 0)),
-                        session.get("timestamp"),
-                        session.get("source", "clickup"),
-                        session.get("clickup_id"),
-                        session.get("task_name"),
-                        session.get("project_name"),
-                        session.get("description", ""),
-                    ),
-                )
+                for entry_id, day, session in items:
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO synced_entries (user_id, entry_id) VALUES (?, ?)",
+                        (user_id, entry_id),
+                    )
+                    if cur.rowcount != 1:
+                        added.append(False)
+                        continue
+                    self.conn.execute(
+                        "INSERT INTO work_sessions (user_id, date, duration_ms, earnings, "
+                        "timestamp, source, clickup_id, task_name, project_name, description) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            user_id,
+                            day,
+                            int(session.get("duration_ms", 0)),
+                            float(session.get("earnings", 0)),
+                            session.get("timestamp"),
+                            session.get("source", "clickup"),
+                            session.get("clickup_id"),
+                            session.get("task_name"),
+                            session.get("project_name"),
+                            session.get("description", ""),
+                        ),
+                    )
+                    added.append(True)
                 self.conn.execute("COMMIT")
-                return True
+                return added
             except Exception:
                 self.conn.execute("ROLLBACK")
                 raise
 
     def format_hours_minutes(self, total_hours: float) -> str:
         """Форматирование времени в формат 'Xч Yм'"""
-        hours = int(total_hours)
-        minutes = int((total_hours - hours) * 60)
-
-        if minutes == 0:
-            return f"{hours}ч"
-        else:
-            return f"{hours}ч {minutes}м"
+        return _fmt_hm(total_hours)
 
     def get_russian_month_year(self, date) -> str:
         """Получение русского названия месяца и года"""
-        months = {
-            'January': 'январь', 'February': 'февраль', 'March': 'март',
-            'April': 'апрель', 'May': 'май', 'June': 'июнь',
-            'July': 'июль', 'August': 'август', 'September': 'сентябрь',
-            'October': 'октябрь', 'November': 'ноябрь', 'December': 'декабрь'
-        }
-        english_month = date.strftime('%B')
-        russian_month = months.get(english_month, english_month.lower())
-        year = date.strftime('%Y')
-        return f"{russian_month} {year}"
+        return _russian_month_year(date.year, date.month)
+
+    def _day_report(self, work_sessions: Dict[str, Any], day: date, label: str,
+                    empty_text: str) -> str:
+        session = work_sessions.get(_day_key(day.toordinal()))
+        if session is None:
+            return empty_text
+        return _DAY_REPORT(
+            label=label,
+            day=day,
+            time=self.format_hours_minutes(session["total_hours"]),
+            earnings=session["total_earnings"],
+        )
 
     def generate_today_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация отчета за сегодня"""
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        if today in work_sessions:
-            session = work_sessions[today]
-            return (
-                f"📊 Заработок за сегодня ({datetime.now().strftime('%d.%m.%Y')}):\n\n"
-                f"⏰ Отработано: {self.format_hours_minutes(session['total_hours'])}\n"
-                f"💰 Заработано: {session['total_earnings']:.2f} руб"
-            )
-        else:
-            return "📊 Сегодня вы еще не добавляли рабочее время"
+        return self._day_report(work_sessions, date.today(), "сегодня",
+                                "📊 Сегодня вы еще не добавляли рабочее время")
 
     def generate_yesterday_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация отчета за вчера"""
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-        if yesterday in work_sessions:
-            session = work_sessions[yesterday]
-            return (
-                f"📊 Заработок за вчера ({(datetime.now() - timedelta(days=1)).strftime('%d.%m.%Y')}):\n\n"
-                f"⏰ Отработано: {self.format_hours_minutes(session['total_hours'])}\n"
-                f"💰 Заработано: {session['total_earnings']:.2f} руб"
-            )
-        else:
-            return "📊 Вчера вы не добавляли рабочее время"
+        return self._day_report(work_sessions, date.today() - timedelta(days=1), "вчера",
+                                "📊 Вчера вы не добавляли рабочее время")
 
     def generate_week_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация отчета за неделю"""
-        today = datetime.now()
+        today = date.today()
         monday = today - timedelta(days=today.weekday())
 
-        total_hours = 0
-        total_earnings = 0
-        days_worked = 0
-
-        current_date = monday
-        while current_date <= today:
-            date_str = current_date.strftime("%Y-%m-%d")
-            if date_str in work_sessions:
-                session = work_sessions[date_str]
-                total_hours += session["total_hours"]
-                total_earnings += session["total_earnings"]
-                days_worked += 1
-            current_date += timedelta(days=1)
+        total_hours, total_earnings, days_worked = _sum_range(
+            work_sessions, monday.toordinal(), today.toordinal())
 
+        period = f"с {_fmt_dm(monday)} по {_fmt_dm(today)}"
         if days_worked > 0:
             return (
-                f"📊 Заработок за неделю (с {monday.strftime('%d.%m')} по {today.strftime('%d.%m')}):\n\n"
+                f"📊 Заработок за неделю ({period}):\n\n"
                 f"📅 Рабочих дней: {days_worked}\n"
                 f"⏰ Всего отработано: {self.format_hours_minutes(total_hours)}\n"
                 f"💰 Всего заработано: {total_earnings:.2f} руб\n"
                 f"📈 Среднее в день: {total_earnings / days_worked:.2f} руб"
             )
         else:
-            return f"📊 На этой неделе (с {monday.strftime('%d.%m')} по {today.strftime('%d.%m')}) нет записей о работе"
+            return f"📊 На этой неделе ({period}) нет записей о работе"
 
     def generate_month_report(self, work_sessions: Dict[str, Any],
-                              bonus_total: float = 0.0, goal: float = 0.0) -> str:
+                              bonus_total: float = 0.0, goal: float = 0.0,
+                              today: Optional[date] = None) -> str:
         """Генерация отчета за текущий календарный месяц"""
-        today = datetime.now()
+        today = today or date.today()
+        today_month = today.month
         first_day_of_month = today.replace(day=1)
+        last_day_of_month = today.replace(day=calendar.monthrange(today.year, today_month)[1])
 
-        if today.month == 12:
-            last_day_of_month = today.replace(day=31)
-        else:
-            last_day_of_month = today.replace(day=1, month=today.month + 1) - timedelta(days=1)
-
-        total_hours = 0
-        total_earnings = 0
-        days_worked = 0
-
-        current_date = first_day_of_month
-        while current_date <= min(today, last_day_of_month):
-            date_str = current_date.strftime("%Y-%m-%d")
-            if date_str in work_sessions:
-                session = work_sessions[date_str]
-                total_hours += session["total_hours"]
-                total_earnings += session["total_earnings"]
-                days_worked += 1
-            current_date += timedelta(days=1)
-
-        month_name = today.strftime("%B %Y")
+        total_hours, total_earnings, days_worked = _sum_range(
+            work_sessions, first_day_of_month.toordinal(), min(today, last_day_of_month).toordinal())
+
+        month_name = self.get_russian_month_year(today)
         if days_worked == 0 and bonus_total == 0:
             return f"📊 В {month_name} нет записей о работе"
 
@@ -564,32 +731,24 @@ class DataManager:
 
     def generate_week_details_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация детального отчета за неделю"""
-        today = datetime.now()
+        today = date.today()
         monday = today - timedelta(days=today.weekday())
 
-        days_names = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
-        total_hours = 0
-        total_earnings = 0
-        response_lines = [f"📊 Детальный заработок за неделю (с {monday.strftime('%d.%m')} по {today.strftime('%d.%m')}):\n"]
-
-        current_date = monday
-        day_index = 0
-        while current_date <= today:
-            date_str = current_date.strftime("%Y-%m-%d")
-            day_name = days_names[day_index]
-
-            if date_str in work_sessions:
-                session = work_sessions[date_str]
-                hours = session["total_hours"]
-                earnings = session["total_earnings"]
-                total_hours += hours
-                total_earnings += earnings
-                response_lines.append(f"📅 {day_name} ({current_date.strftime('%d.%m')}): {self.format_hours_minutes(hours)} = {earnings:.2f} руб")
-            else:
-                response_lines.append(f"📅 {day_name} ({current_date.strftime('%d.%m')}): 0ч = 0 руб")
-
-            current_date += timedelta(days=1)
-            day_index += 1
+        start_ordinal = monday.toordinal()
+        days = [
+            (_DAYS_RU[i], monday + timedelta(days=i), work_sessions.get(_day_key(start_ordinal + i)))
+            for i in range(today.toordinal() - start_ordinal + 1)
+        ]
+        total_hours = sum(s["total_hours"] for _, _, s in days if s is not None)
+        total_earnings = sum(s["total_earnings"] for _, _, s in days if s is not None)
+
+        response_lines = [f"📊 Детальный заработок за неделю (с {_fmt_dm(monday)} по {_fmt_dm(today)}):\n"]
+        response_lines += [
+            f"📅 {day_name} ({_fmt_dm(day)}): "
+            + (f"{self.format_hours_minutes(s['total_hours'])} = {s['total_earnings']:.2f} руб"
+               if s is not None else "0ч = 0 руб")
+            for day_name, day, s in days
+        ]
 
         if total_hours > 0:
             response_lines.extend([
@@ -603,208 +762,79 @@ class DataManager:
 
         return "\n".join(response_lines)
 
-    def generate_month_weeks_report(self, work_sessions: Dict[str, Any]) -> str:
-        """Генерация отчета по неделям в текущем месяце"""
-        today = datetime.now()
-        first_day_of_month = today.replace(day=1)
-
-        if today.month == 12:
-            last_day_of_month = today.replace(day=31)
-        else:
-            last_day_of_month = today.replace(day=1, month=today.month + 1) - timedelta(days=1)
-
-        weeks_data = []
-        total_month_hours = 0
-        total_month_earnings = 0
-        week_number = 1
-
-        current_start = first_day_of_month
-
-        while current_start <= today and current_start.month == today.month:
-            if current_start == first_day_of_month:
-                days_until_sunday = (6 - current_start.weekday()) % 7
-                week_end = current_start + timedelta(days=days_until_sunday)
-            else:
-                week_end = current_start + timedelta(days=6)
-
-            week_end = min(week_end, last_day_of_month, today)
-
-            week_hours = 0
-            week_earnings = 0
-
-            current_date = current_start
-            while current_date <= week_end:
-                date_str = current_date.strftime("%Y-%m-%d")
-                if date_str in work_sessions:
-                    session = work_sessions[date_str]
-                    week_hours += session["total_hours"]
-                    week_earnings += session["total_earnings"]
-                current_date += timedelta(days=1)
-
-            if week_hours > 0:
-                weeks_data.append({
-                    'number': week_number,
-                    'start': current_start,
-                    'end': week_end,
-                    'hours': week_hours,
-                    'earnings': week_earnings
-                })
-                total_month_hours += week_hours
-                total_month_earnings += week_earnings
-
-            if current_start == first_day_of_month:
-                days_until_sunday = (6 - current_start.weekday()) % 7
-                current_start = current_start + timedelta(days=days_until_sunday + 1)
-            else:
-                current_start += timedelta(days=7)
-
-            week_number += 1
-
-        if weeks_data:
-            response_lines = [f"📊 Заработок по неделям в {self.get_russian_month_year(today)}:\n"]
-
-            for week in weeks_data:
-                response_lines.append(
-                    f"📅 Неделя {week['number']} ({week['start'].strftime('%d.%m')} - {week['end'].strftime('%d.%m')}): "
-                    f"{self.format_hours_minutes(week['hours'])} = {week['earnings']:.2f} руб"
-                )
-
-            response_lines.extend([
-                "",
-                f"📊 Итого за месяц:",
-                f"📅 Недель с работой: {len(weeks_data)}",
-                f"⏰ Всего отработано: {self.format_hours_minutes(total_month_hours)}",
-                f"💰 Всего заработано: {total_month_earnings:.2f} руб"
-            ])
-        else:
-            response_lines = [f"📊 В {self.get_russian_month_year(today)} нет записей о работе"]
+    def _weeks_report(self, month_name: str, weeks_data: List[Dict[str, Any]],
+                      total_hours: float, total_earnings: float) -> str:
+        """Текст отчёта по неделям месяца: заголовок, строки недель и итог — одним join"""
+        if not weeks_data:
+            return f"📊 В {month_name} нет записей о работе"
 
+        fmt = self.format_hours_minutes
+        response_lines = [f"📊 Заработок по неделям в {month_name}:\n"]
+        response_lines.extend(
+            f"📅 Неделя {week['number']} ({_fmt_dm(week['start'])} - {_fmt_dm(week['end'])}): "
+            f"{fmt(week['hours'])} = {week['earnings']:.2f} руб"
+            for week in weeks_data
+        )
+        response_lines += (
+            "",
+            "📊 Итого за месяц:",
+            f"📅 Недель с работой: {len(weeks_data)}",
+            f"⏰ Всего отработано: {fmt(total_hours)}",
+            f"💰 Всего заработано: {total_earnings:.2f} руб",
+        )
         return "\n".join(response_lines)
 
+    def generate_month_weeks_report(self, work_sessions: Dict[str, Any]) -> str:
+        """Генерация отчета по неделям в текущем месяце"""
+        today = date.today()
+        weeks_data, total_month_hours, total_month_earnings = _month_weeks(
+            work_sessions, today.replace(day=1), today)
+        return self._weeks_report(self.get_russian_month_year(today), weeks_data,
+                                  total_month_hours, total_month_earnings)
+
     def generate_prev_month_weeks_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация отчета по неделям в предыдущем месяце"""
-        today = datetime.now()
-
-        if today.month == 1:
-            prev_month_first = today.replace(year=today.year - 1, month=12, day=1)
-        else:
-            prev_month_first = today.replace(month=today.month - 1, day=1)
-
-        if prev_month_first.month == 12:
-            prev_month_last = prev_month_first.replace(day=31)
-        else:
-            prev_month_last = prev_month_first.replace(day=1, month=prev_month_first.month + 1) - timedelta(days=1)
-
-        weeks_data = []
-        total_month_hours = 0
-        total_month_earnings = 0
-        week_number = 1
-
-        current_start = prev_month_first
-
-        while current_start <= prev_month_last:
-            if current_start == prev_month_first:
-                days_until_sunday = (6 - current_start.weekday()) % 7
-                week_end = current_start + timedelta(days=days_until_sunday)
-            else:
-                week_end = current_start + timedelta(days=6)
-
-            week_end = min(week_end, prev_month_last)
-
-            week_hours = 0
-            week_earnings = 0
-
-            current_date = current_start
-            while current_date <= week_end:
-                date_str = current_date.strftime("%Y-%m-%d")
-                if date_str in work_sessions:
-                    session = work_sessions[date_str]
-                    week_hours += session["total_hours"]
-                    week_earnings += session["total_earnings"]
-                current_date += timedelta(days=1)
-
-            if week_hours > 0:
-                weeks_data.append({
-                    'number': week_number,
-                    'start': current_start,
-                    'end': week_end,
-                    'hours': week_hours,
-                    'earnings': week_earnings
-                })
-                total_month_hours += week_hours
-                total_month_earnings += week_earnings
-
-            if current_start == prev_month_first:
-                days_until_sunday = (6 - current_start.weekday()) % 7
-                current_start = current_start + timedelta(days=days_until_sunday + 1)
-            else:
-                current_start += timedelta(days=7)
-
-            week_number += 1
-
-        if weeks_data:
-            prev_month_name = self.get_russian_month_year(prev_month_first)
-            response_lines = [f"📊 Заработок по неделям в {prev_month_name}:\n"]
-
-            for week in weeks_data:
-                response_lines.append(
-                    f"📅 Неделя {week['number']} ({week['start'].strftime('%d.%m')} - {week['end'].strftime('%d.%m')}): "
-                    f"{self.format_hours_minutes(week['hours'])} = {week['earnings']:.2f} руб"
-                )
-
-            response_lines.extend([
-                "",
-                f"📊 Итого за месяц:",
-                f"📅 Недель с работой: {len(weeks_data)}",
-                f"⏰ Всего отработано: {self.format_hours_minutes(total_month_hours)}",
-                f"💰 Всего заработано: {total_month_earnings:.2f} руб"
-            ])
-        else:
-            prev_month_name = self.get_russian_month_year(prev_month_first)
-            response_lines = [f"📊 В {prev_month_name} нет записей о работе"]
-
-        return "\n".join(response_lines)
+        prev_month_last = date.today().replace(day=1) - ONE_DAY
+        prev_month_first = prev_month_last.replace(day=1)
+        weeks_data, total_month_hours, total_month_earnings = _month_weeks(
+            work_sessions, prev_month_first, prev_month_last)
+        return self._weeks_report(self.get_russian_month_year(prev_month_first), weeks_data,
+                                  total_month_hours, total_month_earnings)
 
     def generate_year_report(self, work_sessions: Dict[str, Any]) -> str:
         """Генерация отчета за год по месяцам"""
-        current_year = datetime.now().year
+        current_year = date.today().year
 
         months_data = {}
         total_year_hours = 0
         total_year_earnings = 0
 
+        year_prefix = f"{current_year}-"
         for date_str, session in work_sessions.items():
+            # Ключи — дни ('YYYY-MM-DD') или уже месяцы ('YYYY-MM'): год и месяц берём срезом
+            if not date_str.startswith(year_prefix):
+                continue
             try:
-                session_date = datetime.strptime(date_str, "%Y-%m-%d")
-
-                if session_date.year == current_year:
-                    month_key = session_date.strftime("%Y-%m")
-
-                    if month_key not in months_data:
-                        months_data[month_key] = {
-                            'hours': 0,
-                            'earnings': 0,
-                            'date_obj': session_date
-                        }
-
-                    months_data[month_key]['hours'] += session["total_hours"]
-                    months_data[month_key]['earnings'] += session["total_earnings"]
-                    total_year_hours += session["total_hours"]
-                    total_year_earnings += session["total_earnings"]
-
+                month_number = int(date_str[5:7])
             except ValueError:
                 continue
+            if not 1 <= month_number <= 12:
+                continue
+
+            month = months_data.setdefault(month_number, {'hours': 0, 'earnings': 0})
+            month['hours'] += session["total_hours"]
+            month['earnings'] += session["total_earnings"]
+            total_year_hours += session["total_hours"]
+            total_year_earnings += session["total_earnings"]
 
         if months_data:
             response_lines = [f"📊 Заработок по месяцам в {current_year} году:\n"]
 
-            sorted_months = sorted(months_data.items(), key=lambda x: x[1]['date_obj'])
-
-            for month_key, data in sorted_months:
-                month_name = self.get_russian_month_year(data['date_obj'])
-                response_lines.append(
-                    f"📅 {month_name}: {self.format_hours_minutes(data['hours'])} = {data['earnings']:.2f} руб"
-                )
+            response_lines.extend(
+                f"📅 {_russian_month_year(current_year, month_number)}: "
+                f"{self.format_hours_minutes(data['hours'])} = {data['earnings']:.2f} руб"
+                for month_number, data in sorted(months_data.items())
+            )
 
             response_lines.extend([
                 "",
@@ -825,12 +855,43 @@ class DataManager:
         workspace_id = settings.get("workspace_id")
         if not api_token or not workspace_id:
             return None
-        return ClickUpClient(api_token, workspace_id)
+        client = self._clickup_clients.get(user_id)
+        if client and client.api_token == api_token and client.workspace_id == workspace_id:
+            return client
+        if client:
+            # Учётные данные сменились — старую сессию закрываем в фоне
+            self._retire_clickup_client(client)
+        client = self._clickup_clients[user_id] = ClickUpClient(
+            api_token, workspace_id, team_id=settings.get("team_id")
+        )
+        return client
+
+    def _retire_clickup_client(self, client: ClickUpClient) -> None:
+        """Закрывает сессию клиента, убранного из кэша, не дожидаясь результата"""
+        closing = client.close_soon()
+        if closing is not None:
+            self._closing_clients.add(closing)
+            closing.add_done_callback(self._closing_clients.discard)
+
+    async def close_clickup_clients(self) -> None:
+        """Закрытие HTTP-сессий всех закэшированных ClickUp клиентов"""
+        clients = list(self._clickup_clients.values())
+        self._clickup_clients.clear()
+        for client in clients:
+            await client.close()
+        # Дожидаемся фоновых закрытий, запущенных в этом же цикле
+        loop = asyncio.get_running_loop()
+        pending = [
+            task for task in self._closing_clients
+            if isinstance(task, asyncio.Task) and task.get_loop() is loop
+        ]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
     async def validate_clickup_credentials(self, api_token: str, workspace_id: str) -> Dict[str, Any]:
         """Валидация ClickUp credentials и получение информации о пользователе"""
+        client = ClickUpClient(api_token, workspace_id)
         try:
-            client = ClickUpClient(api_token, workspace_id)
             team_id = await client.get_team_id()
 
             if not team_id:
@@ -848,9 +909,12 @@ class DataManager:
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
+        finally:
+            await client.close()
 
     def group_sessions_by_task(self, sessions: List[Dict]) -> Dict[str, Dict]:
-        """Группировка сессий по названиям задач"""
+        """Группировка сессий по названиям задач: только суммы, счётчик и границы периода,
+        сами сессии в группы не копируются"""
         tasks = {}
 
         for session in sessions:
@@ -859,51 +923,52 @@ class DataManager:
             if session.get("source") == "clickup":
                 task_name = session.get("task_name", "Неизвестная задача")
 
-            if task_name not in tasks:
-                tasks[task_name] = {
+            task_data = tasks.get(task_name)
+            if task_data is None:
+                task_data = tasks[task_name] = {
                     "task_name": task_name,
                     "total_hours": 0,
                     "total_earnings": 0,
                     "sessions_count": 0,
                     "first_session": None,
                     "last_session": None,
-                    "sessions": [],
                     "source_type": session.get("source", "manual")
                 }
 
-            task_data = tasks[task_name]
-            session_hours = session.get("duration_ms", 0) / 3_600_000
+            session_hours = session.get("duration_ms", 0) / MS_PER_HOUR
             session_earnings = session.get("earnings", 0)
             session_timestamp = session.get("timestamp")
 
             task_data["total_hours"] += session_hours
             task_data["total_earnings"] += session_earnings
             task_data["sessions_count"] += 1
-            task_data["sessions"].append(session)
 
+            # ISO-строки одного формата сравниваются как время; first <= last,
+            # поэтому новая метка может сдвинуть только одну из границ
             if session_timestamp:
-                if not task_data["first_session"] or session_timestamp < task_data["first_session"]:
+                first_session = task_data["first_session"]
+                if first_session is None:
+                    task_data["first_session"] = task_data["last_session"] = session_timestamp
+                elif session_timestamp < first_session:
                     task_data["first_session"] = session_timestamp
-                if not task_data["last_session"] or session_timestamp > task_data["last_session"]:
+                elif session_timestamp > task_data["last_session"]:
                     task_data["last_session"] = session_timestamp
 
         return tasks
 
     def get_tasks_summary(self, user_id: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
         """Получение сводки по задачам за указанный период"""
-        work_sessions = self.get_work_sessions(user_id)
-
-        all_sessions = []
-        current_date = start_date
+        work_sessions = self.get_work_sessions(
+            user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        )
 
-        while current_date <= end_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            if date_str in work_sessions:
-                day_sessions = work_sessions[date_str]["sessions"]
-                for session in day_sessions:
-                    session["date"] = date_str
-                    all_sessions.append(session)
-            current_date += timedelta(days=1)
+        # Выборка уже ограничена периодом: проходим дни по порядку ключей,
+        # не шагая по календарю и не дописывая дату в сами сессии
+        all_sessions = [
+            session
+            for date_str in sorted(work_sessions)
+            for session in work_sessions[date_str]["sessions"]
+        ]
 
         if not all_sessions:
             return {
@@ -934,34 +999,37 @@ class DataManager:
 
     def get_days_breakdown(self, user_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Разбивка по дням за период (для аналитики в вебапп)"""
-        work_sessions = self.get_work_sessions(user_id)
-        weekdays = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+        work_sessions = self.get_daily_totals(
+            user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        )
 
         days = []
         current = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
         while current.date() <= end_date.date():
-            date_str = current.strftime("%Y-%m-%d")
+            date_str = _day_key(current.toordinal())
             hours = 0
             earnings = 0
-            if date_str in work_sessions:
-                session = work_sessions[date_str]
+            session = work_sessions.get(date_str)
+            if session is not None:
                 hours = session.get("total_hours", 0)
                 earnings = session.get("total_earnings", 0)
 
             days.append({
                 "date": date_str,
-                "label": weekdays[current.weekday()],
-                "sub": current.strftime("%d.%m"),
+                "label": _DAYS_RU_SHORT[current.weekday()],
+                "sub": _fmt_dm(current),
                 "hours": hours,
                 "earnings": earnings,
             })
-            current += timedelta(days=1)
+            current += ONE_DAY
 
         return days
 
     def get_weeks_breakdown(self, user_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Разбивка по календарным неделям за период (для аналитики в вебапп)"""
-        work_sessions = self.get_work_sessions(user_id)
+        work_sessions = self.get_daily_totals(
+            user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        )
 
         weeks = []
         number = 1
@@ -977,37 +1045,44 @@ class DataManager:
             week_earnings = 0
             day = current_start
             while day.date() <= week_end.date():
-                date_str = day.strftime("%Y-%m-%d")
-                if date_str in work_sessions:
-                    session = work_sessions[date_str]
+                date_str = _day_key(day.toordinal())
+                session = work_sessions.get(date_str)
+                if session is not None:
                     week_hours += session.get("total_hours", 0)
                     week_earnings += session.get("total_earnings", 0)
-                day += timedelta(days=1)
+                day += ONE_DAY
 
             weeks.append({
                 "number": number,
                 "label": f"Неделя {number}",
-                "sub": f"{current_start.strftime('%d.%m')}–{week_end.strftime('%d.%m')}",
+                "sub": f"{_fmt_dm(current_start)}–{_fmt_dm(week_end)}",
                 "hours": week_hours,
                 "earnings": week_earnings,
             })
 
-            current_start = (week_end + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            current_start = (week_end + ONE_DAY).replace(hour=0, minute=0, second=0, microsecond=0)
             number += 1
 
         return weeks
 
     def get_months_breakdown(self, user_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Разбивка по календарным месяцам за период (для аналитики в вебапп)"""
-        work_sessions = self.get_work_sessions(user_id)
-        month_names = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
+        work_sessions = self.get_daily_totals(
+            user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        )
+
+        # Ключи разбираем один раз, а не заново для каждого месяца
+        parsed_days = []
+        for date_str, session in work_sessions.items():
+            try:
+                parsed_days.append((date.fromisoformat(date_str), session))
+            except ValueError:
+                continue
+        period_start, period_end = start_date.date(), end_date.date()
 
         months = []
         current = start_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        while current.date() <= end_date.date():
+        while current.date() <= period_end:
             # Первый день следующего месяца
             if current.month == 12:
                 next_month = current.replace(year=current.year + 1, month=1)
@@ -1016,19 +1091,16 @@ class DataManager:
 
             month_hours = 0
             month_earnings = 0
-            for date_str, session in work_sessions.items():
-                try:
-                    day = datetime.strptime(date_str, "%Y-%m-%d")
-                except ValueError:
-                    continue
-                if current.date() <= day.date() < next_month.date() and start_date.date() <= day.date() <= end_date.date():
+            month_first, month_next = current.date(), next_month.date()
+            for day, session in parsed_days:
+                if month_first <= day < month_next and period_start <= day <= period_end:
                     month_hours += session.get("total_hours", 0)
                     month_earnings += session.get("total_earnings", 0)
 
             months.append({
-                "date": current.strftime("%Y-%m"),
-                "label": month_names[current.month - 1],
-                "sub": current.strftime("%Y"),
+                "date": f"{current.year}-{current.month:02d}",
+                "label": _RU_MONTHS_TITLE[current.month],
+                "sub": str(current.year),
                 "hours": month_hours,
                 "earnings": month_earnings,
             })
@@ -1056,7 +1128,7 @@ class DataManager:
         if start_date.date() == end_date.date():
             period_str = start_date.strftime("%d.%m.%Y")
         else:
-            period_str = f"{start_date.strftime('%d.%m')} - {end_date.strftime('%d.%m.%Y')}"
+            period_str = f"{_fmt_dm(start_date)} - {end_date.strftime('%d.%m.%Y')}"
 
         response_lines = [f"📊 Сводка по задачам за {period_str}:\n"]
 
@@ -1074,13 +1146,15 @@ class DataManager:
 
             source_emoji = "🔗" if task["source_type"] == "clickup" else "✏️"
 
-            response_lines.append(f"{source_emoji} {task_name}")
-            response_lines.append(f"⏱️ Время: {self.format_hours_minutes(total_hours)} ({sessions_count} сессий)")
-            response_lines.append(f"💰 Заработок: {total_earnings:.2f} руб")
+            response_lines += (
+                f"{source_emoji} {task_name}",
+                f"⏱️ Время: {self.format_hours_minutes(total_hours)} ({sessions_count} сессий)",
+                f"💰 Заработок: {total_earnings:.2f} руб",
+            )
 
             if task["first_session"] and task["last_session"]:
-                first_date = datetime.fromisoformat(task["first_session"]).strftime("%d.%m")
-                last_date = datetime.fromisoformat(task["last_session"]).strftime("%d.%m")
+                first_date = _fmt_dm(datetime.fromisoformat(task["first_session"]))
+                last_date = _fmt_dm(datetime.fromisoformat(task["last_session"]))
                 if first_date == last_date:
                     response_lines.append(f"📅 Дата: {first_date}")
                 else:
@@ -1178,8 +1252,42 @@ class DataManager:
         cache[list_id] = name
         return name
 
+    async def _fetch_clickup_entries(self, clickup_client, start_date: datetime,
+                                     end_date: datetime) -> List[Dict[str, Any]]:
+        """Записи ClickUp за период; длинные окна запрашиваются кусками по SYNC_WINDOW одновременно.
+        Ошибка любого куска пробрасывается — синк без части записей не считается успешным."""
+        if end_date - start_date <= SYNC_WINDOW:
+            return await clickup_client.get_time_entries(start_date, end_date, raise_errors=True)
+
+        windows = []
+        cursor = start_date
+        while cursor < end_date:
+            window_end = min(cursor + SYNC_WINDOW, end_date)
+            windows.append((cursor, window_end))
+            cursor = window_end
+        chunks = await asyncio.gather(
+            *(clickup_client.get_time_entries(a, b, raise_errors=True) for a, b in windows)
+        )
+        # Запись на границе соседних окон может прийти дважды
+        entries: Dict[Any, Dict[str, Any]] = {}
+        for chunk in chunks:
+            for entry in chunk:
+                entries.setdefault(entry.get('id'), entry)
+        return list(entries.values())
+
     async def sync_clickup_entries(self, user_id: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
-        """Синхронизация записей ClickUp с данными пользователя"""
+        """Синхронизация записей ClickUp с данными пользователя.
+
+        Для одного пользователя одновременно идёт не больше одной синхронизации:
+        повторный /syncclickup или автосинк поверх ручного сразу получает отказ."""
+        lock = self._sync_locks.setdefault(user_id, asyncio.Lock())
+        if lock.locked():
+            return {"success": False, "error": "Синхронизация уже выполняется, попробуйте чуть позже"}
+        async with lock:
+            return await self._sync_clickup_entries(user_id, start_date, end_date)
+
+    async def _sync_clickup_entries(self, user_id: str, start_date: datetime,
+                                    end_date: datetime) -> Dict[str, Any]:
         clickup_client = self.get_user_clickup_client(user_id)
         if not clickup_client:
             return {"success": False, "error": "ClickUp не настроен для этого пользователя"}
@@ -1188,27 +1296,24 @@ class DataManager:
         list_name_cache: Dict[str, str] = {}
 
         try:
-            clickup_entries = await clickup_client.get_time_entries(start_date, end_date)
+            clickup_entries = await self._fetch_clickup_entries(clickup_client, start_date, end_date)
 
             if not clickup_entries:
                 return {"success": True, "synced_count": 0, "message": "Записи не найдены"}
 
-            synced_count = 0
-            total_hours = 0
-            total_earnings = 0
-
+            # Уже синхронизированные записи отсеиваем до запросов названий списков
+            synced_ids = self.get_synced_entry_ids(
+                user_id, {entry.get('id') for entry in clickup_entries})
+            pending = []
             for entry in clickup_entries:
                 entry_id = entry.get('id')
                 duration_ms = int(entry.get('duration', 0))
 
-                if duration_ms < 0:
+                if duration_ms < 0 or entry_id in synced_ids:
                     continue
 
-                duration_hours = duration_ms / (1000 * 60 * 60)
-                earnings = duration_hours * rate
-
-                start_timestamp = int(entry.get('start', 0)) / 1000
-                entry_date = datetime.fromtimestamp(start_timestamp).strftime("%Y-%m-%d")
+                earnings = duration_ms / MS_PER_HOUR * rate
+                started_at = datetime.fromtimestamp(int(entry.get('start', 0)) / 1000)
 
                 project_name = await self._resolve_list_name(
                     clickup_client, self._entry_list_id(entry), list_name_cache
@@ -1221,7 +1326,7 @@ class DataManager:
                 clickup_session = {
                     "duration_ms": duration_ms,
                     "earnings": earnings,
-                    "timestamp": datetime.fromtimestamp(start_timestamp).isoformat(),
+                    "timestamp": started_at.isoformat(),
                     "source": "clickup",
                     "clickup_id": entry_id,
                     "task_name": task_name,
@@ -1229,13 +1334,20 @@ class DataManager:
                     "description": entry.get('description', ''),
                 }
 
-                # Атомарно: дедуп + вставка сессии одной транзакцией
-                if not self.add_synced_session(user_id, entry_id, entry_date, clickup_session):
-                    continue
+                pending.append((entry_id, started_at.date().isoformat(), clickup_session))
 
+            # Дедуп + вставка всех новых сессий одной транзакцией
+            added = await asyncio.to_thread(self.add_synced_sessions, user_id, pending)
+
+            synced_count = 0
+            total_hours = 0
+            total_earnings = 0
+            for is_new, (_, _, session) in zip(added, pending):
+                if not is_new:
+                    continue
                 synced_count += 1
-                total_hours += duration_hours
-                total_earnings += earnings
+                total_hours += session["duration_ms"] / MS_PER_HOUR
+                total_earnings += session["earnings"]
 
             return {
                 "success": True,
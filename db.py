@@ -1,5 +1,8 @@
 import sqlite3
 
+# Размер WAL (в страницах), после которого SQLite сам делает чекпоинт.
+WAL_AUTOCHECKPOINT_PAGES = 1000
+
 _SCHEMA = """
 CREATE TABLE IF NOT EXISTS users (
     user_id              TEXT PRIMARY KEY,
@@ -81,6 +84,12 @@ def get_connection(db_path: str) -> sqlite3.Connection:
     conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)   # autocommit
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
+    # WAL — append-only журнал: коммит дописывает страницы в конец -wal файла,
+    # а чекпоинт периодически сливает их в основную БД. В WAL-режиме
+    # synchronous=NORMAL не fsync-ит каждый коммит (только чекпоинт) и при этом
+    # не теряет целостность при падении процесса.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}")
     conn.execute("PRAGMA foreign_keys=ON")
     conn.execute("PRAGMA busy_timeout=5000")
     init_schema(conn)
@@ -1,27 +1,33 @@
 import asyncio
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from dotenv import load_dotenv
 import logging
 
-from aiogram import Bot, Dispatcher, F
-from aiogram.filters import Command
+from aiogram import BaseMiddleware, Bot, Dispatcher, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
 from aiogram.types import (
     Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton,
     MenuButtonWebApp, WebAppInfo
 )
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from clickup_client import ClickUpClient, retry_with_backoff
-from data_manager import DataManager
+from data_manager import MAX_SYNC_DAYS, DataManager, earnings_period_start, parse_hhmm
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 WEBAPP_URL = os.getenv("WEBAPP_URL", "")
+REDIS_URL = os.getenv("REDIS_URL", "")
+# Незавершённые диалоги (ввод ставки, премии и т.п.) в Redis живут не дольше часа
+FSM_STATE_TTL_SECONDS = 3600
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +51,126 @@ NOTIF_TOGGLE_FIELDS = {
     "autosync": "autosync_enabled",
 }
 
+WELCOME_TEXT = (
+    "🎯 Добро пожаловать в бота для подсчета зарплаты!\n\n"
+    "Этот бот поможет вам отслеживать рабочее время и рассчитывать заработок.\n\n"
+    "📋 Основные команды:\n"
+    "/setrate [ставка] - установить ставку (руб/час)\n"
+    "/today - заработок за сегодня\n"
+    "/yesterday - заработок за вчера\n"
+    "/week - заработок за неделю (с понедельника)\n"
+    "/weekdetails - детальный заработок по дням недели\n"
+    "/month - заработок за месяц\n"
+    "/monthweeks - заработок по неделям в месяце\n"
+    "/year - заработок по месяцам в году\n\n"
+    "🔗 ClickUp интеграция:\n"
+    "/clickup_setup - настроить интеграцию с ClickUp\n"
+    "/syncclickup - синхронизировать данные за сегодня\n"
+    "/synclast - синхронизировать за последние дни\n"
+    "/clickupstatus - статус интеграции\n\n"
+    "📊 Аналитика:\n"
+    "/tasksummary - сводка по задачам за неделю\n\n"
+    "🎯 Управление задачами:\n"
+    "/tasks - список задач по проектам\n"
+    "/active_task - просмотр активной задачи\n\n"
+    "/help - показать полную справку\n\n"
+)
+
+# Подсказка про Mini App в /start — только если вебапп настроен
+WELCOME_APP_HINT = "\n\n🌐 Telegram Mini App: /app" if WEBAPP_URL else ""
+WELCOME_RATE_LINE = "💰 Ваша текущая ставка: {rate} руб/час"
+WELCOME_NO_RATE_LINE = "⚠️ Сначала установите свою ставку командой /setrate"
+
+CLICKUP_NOT_CONFIGURED_TEXT = (
+    "❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки"
+)
+CLICKUP_NOT_CONFIGURED_ALERT = "❌ ClickUp не настроен"
+RATE_REQUIRED_TEXT = "❌ Сначала установите ставку командой /setrate"
+
+HELP_TEXT = (
+    "📋 Справка по командам:\n\n"
+    "🏠 Основные команды:\n"
+    "/start - главное меню\n"
+    "/setrate [ставка] - установить ставку (руб/час)\n"
+    "/goal [сумма] - цель заработка на месяц\n"
+    "/bonus - добавить премию\n"
+    "/bonuses - список премий за год\n"
+    "/today - заработок за сегодня\n"
+    "/yesterday - заработок за вчера\n"
+    "/week - заработок за неделю (с понедельника)\n"
+    "/weekdetails - детальный заработок по дням недели\n"
+    "/month - заработок за месяц\n"
+    "/monthweeks - заработок по неделям в месяце\n"
+    "/year - заработок по месяцам в году\n\n"
+    "🔗 ClickUp интеграция:\n"
+    "/clickup_setup - пошаговая настройка ClickUp\n"
+    "/clickup_token - установить Personal API Token\n"
+    "/clickup_workspace - установить Workspace ID\n"
+    "/clickup_reset - сбросить настройки ClickUp\n"
+    "/syncclickup - синхронизировать данные за сегодня\n"
+    "/synclast [дни] - синхронизировать за последние N дней (по умолчанию 7)\n"
+    "/clickupstatus - статус интеграции и активные таймеры\n"
+    "/notifications - автосинк и уведомления (дайджест, сводка, забытый таймер)\n\n"
+    "📊 Аналитика задач:\n"
+    "/tasksummary - сводка по задачам за неделю\n"
+    "/tasksummary today - сводка за сегодня\n"
+    "/tasksummary month - сводка за месяц\n"
+    "/tasksummary 7 - сводка за последние 7 дней\n\n"
+    "🎯 Управление задачами:\n"
+    "/tasks - просмотр всех задач с возможностью управления\n"
+    "/active_task - информация об активной задаче с таймером\n\n"
+    "💡 Для добавления времени используйте формат: ЧАСЫ МИНУТЫ\n"
+    "Например: 8 30 (означает 8 часов 30 минут)\n\n"
+    "🔄 ClickUp синхронизация автоматически объединяет данные из ClickUp с вашими ручными записями.\n"
+    "Каждый пользователь может настроить свои собственные ClickUp credentials."
+)
+
+# Команда бота -> тип отчёта о заработке (он же суффикс callback_data "earnings_*")
+EARNINGS_COMMANDS = {
+    "today": "today",
+    "yesterday": "yesterday",
+    "week": "week",
+    "weekdetails": "week_details",
+    "month": "month",
+    "monthweeks": "month_weeks",
+    "prevmonthweeks": "prev_month_weeks",
+    "year": "year",
+}
+
+# Генераторы DataManager по дневным итогам; месяц собирается отдельно (премии и цель)
+EARNINGS_GENERATORS = {
+    "today": "generate_today_report",
+    "yesterday": "generate_yesterday_report",
+    "week": "generate_week_report",
+    "week_details": "generate_week_details_report",
+    "month_weeks": "generate_month_weeks_report",
+    "prev_month_weeks": "generate_prev_month_weeks_report",
+    "year": "generate_year_report",
+}
+
+
+def build_fsm_storage() -> BaseStorage:
+    """RedisStorage при заданном REDIS_URL (FSM переживает рестарт, нужен пакет redis),
+    иначе MemoryStorage."""
+    if not REDIS_URL:
+        return MemoryStorage()
+    from aiogram.fsm.storage.redis import RedisStorage
+    return RedisStorage.from_url(
+        REDIS_URL,
+        connection_kwargs={"max_connections": 32},
+        state_ttl=FSM_STATE_TTL_SECONDS,
+        data_ttl=FSM_STATE_TTL_SECONDS,
+    )
+
+
+async def edit_status_or_answer(status_message: Message, message: Message, text: str) -> None:
+    """Заменяет текст статусного сообщения на итог; если сообщение удалили
+    или Telegram отказал в правке — отправляет итог новым сообщением."""
+    try:
+        await status_message.edit_text(text)
+    except TelegramBadRequest:
+        await message.answer(text)
+
 
 def parse_bonus_date(value: str) -> Optional[str]:
     """ДД.ММ.ГГГГ или ГГГГ-ММ-ДД → 'YYYY-MM-DD'; None, если не дата."""
@@ -57,12 +183,9 @@ def parse_bonus_date(value: str) -> Optional[str]:
     return None
 
 
-def valid_hhmm(value: str) -> bool:
-    parts = value.split(":")
-    if len(parts) != 2 or not all(p.isdigit() for p in parts):
-        return False
-    hours, minutes = int(parts[0]), int(parts[1])
-    return 0 <= hours <= 23 and 0 <= minutes <= 59
+# Personal API Token ClickUp: pk_ и не менее 20 символов всего; Workspace ID: от 8 цифр
+_CLICKUP_TOKEN_RE = re.compile(r"pk_[A-Za-z0-9_]{17,}")
+_WORKSPACE_ID_RE = re.compile(r"[0-9]{8,}")
 
 
 def build_notifications_view(settings: Dict[str, Any]) -> tuple:
@@ -99,13 +222,30 @@ def build_notifications_view(settings: Dict[str, Any]) -> tuple:
     return text, keyboard
 
 
+class UserIdMiddleware(BaseMiddleware):
+    """Кладёт строковый Telegram user_id в данные хендлера (аргумент user_id),
+    чтобы хендлеры не вычисляли его каждый сам."""
+
+    async def __call__(self, handler: Callable[..., Awaitable[Any]], event: Any,
+                       data: Dict[str, Any]) -> Any:
+        from_user = getattr(event, "from_user", None)
+        if from_user is not None:
+            data["user_id"] = str(from_user.id)
+        return await handler(event, data)
+
+
 class SalaryBot:
-    def __init__(self, token: str):
+    def __init__(self, token: str, data_manager: Optional[DataManager] = None):
         self.bot = Bot(token=token)
-        self.dp = Dispatcher(storage=MemoryStorage())
-        import migrate_to_sqlite
-        migrate_to_sqlite.migrate()
-        self.data_manager = DataManager()
+        self.dp = Dispatcher(storage=build_fsm_storage())
+        self.dp.message.middleware(UserIdMiddleware())
+        self.dp.callback_query.middleware(UserIdMiddleware())
+        if data_manager is None:
+            # Отдельный запуск бота (python main.py); из api.py приходит общий DataManager
+            import migrate_to_sqlite
+            migrate_to_sqlite.migrate()
+            data_manager = DataManager()
+        self.data_manager = data_manager
         self.setup_handlers()
 
     def escape_markdown(self, text: str) -> str:
@@ -266,10 +406,7 @@ class SalaryBot:
         for task in tasks:
             project_name = task.get('project_name', 'Неизвестный проект')
 
-            if project_name not in grouped:
-                grouped[project_name] = []
-
-            grouped[project_name].append(task)
+            grouped.setdefault(project_name, []).append(task)
 
         return grouped
 
@@ -292,7 +429,7 @@ class SalaryBot:
                 due_timestamp = int(due_date) / 1000
                 due_datetime = datetime.fromtimestamp(due_timestamp)
                 due_text = due_datetime.strftime('%d.%m.%Y %H:%M')
-            except Exception:
+            except (TypeError, ValueError, OverflowError, OSError):
                 due_text = "Некорректная дата"
 
         task_url = task_data.get('url', '')
@@ -386,7 +523,7 @@ class SalaryBot:
                 due_timestamp = int(due_date) / 1000
                 due_datetime = datetime.fromtimestamp(due_timestamp)
                 due_text = due_datetime.strftime('%d.%m.%Y')
-            except Exception:
+            except (TypeError, ValueError, OverflowError, OSError):
                 due_text = "Некорректная дата"
 
         escaped_name = self.escape_markdown(task_name)
@@ -492,7 +629,7 @@ class SalaryBot:
                 due_timestamp = int(due_date) / 1000
                 due_datetime = datetime.fromtimestamp(due_timestamp)
                 due_text = due_datetime.strftime('%d.%m.%Y')
-            except Exception:
+            except (TypeError, ValueError, OverflowError, OSError):
                 due_text = "Некорректная дата"
 
         escaped_name = self.escape_markdown(task_name)
@@ -516,15 +653,71 @@ class SalaryBot:
             parse_mode="Markdown"
         )
 
+    async def _daily_totals(self, user_id: str, start_date: str) -> Dict[str, Any]:
+        """Дневные итоги пользователя начиная с start_date; запрос в отдельном
+        потоке, чтобы не блокировать event loop."""
+        return await asyncio.to_thread(self.data_manager.get_daily_totals, user_id, start_date)
+
+    async def _tasks_summary_text(self, user_id: str, start_date: datetime, end_date: datetime) -> str:
+        """Сводка по задачам за период, собранная в отдельном потоке."""
+        def build() -> str:
+            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
+            return self.data_manager.format_task_summary(summary)
+        return await asyncio.to_thread(build)
+
     def month_report_with_bonuses(self, user_id: str) -> str:
         """Месячный отчёт с премиями и целью (единый для /month и inline-кнопок)."""
-        progress = self.data_manager.get_month_progress(user_id)
+        # Один момент времени на весь отчёт — прогресс, выборка и текст не разъедутся в полночь
+        now = datetime.now()
+        today = now.date()
+        progress = self.data_manager.get_month_progress(user_id, now)
         return self.data_manager.generate_month_report(
-            self.data_manager.get_work_sessions(user_id),
+            self.data_manager.get_daily_totals(
+                user_id, earnings_period_start("month", today)),
             bonus_total=progress["bonus_earnings"],
             goal=progress["goal"],
+            today=today,
         )
 
+    async def _earnings_content(self, user_id: str, report_type: str) -> str:
+        if report_type == "month":
+            return await asyncio.to_thread(self.month_report_with_bonuses, user_id)
+        generate = getattr(self.data_manager, EARNINGS_GENERATORS[report_type])
+        start = earnings_period_start(report_type, date.today())
+        if report_type == "year":
+            # Годовому отчёту хватает помесячных итогов
+            return generate(await asyncio.to_thread(
+                self.data_manager.get_monthly_totals, user_id, start))
+        return generate(await self._daily_totals(user_id, start))
+
+    async def earnings_command(self, message: Message, command: CommandObject, user_id: str):
+        """/today, /week, /month и т.д. — один обработчик на все отчёты о заработке."""
+        report_type = EARNINGS_COMMANDS[command.command]
+        content = await self._earnings_content(user_id, report_type)
+        await self.send_earnings_report(message, report_type, content)
+
+    async def earnings_callback(self, callback: CallbackQuery, user_id: str):
+        """Переключение отчётов о заработке inline-кнопками."""
+        report_type = callback.data.removeprefix("earnings_")
+        content = await self._earnings_content(user_id, report_type)
+
+        keyboard = self.create_earnings_keyboard(report_type)
+        await callback.message.edit_text(content, reply_markup=keyboard)
+        await callback.answer()
+
+    async def _set_rate_from_text(self, message: Message, user_id: str, text: str) -> bool:
+        try:
+            rate = float(text)
+        except ValueError:
+            await message.answer("❌ Пожалуйста, введите корректное число!")
+            return False
+        if rate <= 0:
+            await message.answer("❌ Ставка должна быть положительным числом!")
+            return False
+        self.data_manager.set_rate(user_id, rate)
+        await message.answer(f"✅ Ставка установлена: {rate} руб/час")
+        return True
+
     async def _set_goal_from_text(self, message: Message, user_id: str, text: str) -> bool:
         try:
             goal = float(text.strip().replace(",", "."))
@@ -558,7 +751,7 @@ class SalaryBot:
         amount, date_str = data["bonus_amount"], data["bonus_date"]
         self.data_manager.add_bonus(user_id, date_str, amount, comment)
         await state.clear()
-        date_h = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
+        date_h = date.fromisoformat(date_str).strftime("%d.%m.%Y")
         comment_line = f"\n💬 {comment}" if comment else ""
         await message.answer(
             f"✅ Премия добавлена: {amount:.0f} руб, {date_h}{comment_line}\n\n"
@@ -569,44 +762,12 @@ class SalaryBot:
         """Настройка обработчиков команд"""
 
         @self.dp.message(Command("start"))
-        async def start_command(message: Message, state: FSMContext):
-            user_id = str(message.from_user.id)
+        async def start_command(message: Message, state: FSMContext, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
-            welcome_text = (
-                "🎯 Добро пожаловать в бота для подсчета зарплаты!\n\n"
-                "Этот бот поможет вам отслеживать рабочее время и рассчитывать заработок.\n\n"
-                "📋 Основные команды:\n"
-                "/setrate - установить ставку (руб/час)\n"
-                "/today - заработок за сегодня\n"
-                "/yesterday - заработок за вчера\n"
-                "/week - заработок за неделю (с понедельника)\n"
-                "/weekdetails - детальный заработок по дням недели\n"
-                "/month - заработок за месяц\n"
-                "/monthweeks - заработок по неделям в месяце\n"
-                "/year - заработок по месяцам в году\n\n"
-                "🔗 ClickUp интеграция:\n"
-                "/clickup_setup - настроить интеграцию с ClickUp\n"
-                "/syncclickup - синхронизировать данные за сегодня\n"
-                "/synclast - синхронизировать за последние дни\n"
-                "/clickupstatus - статус интеграции\n\n"
-                "📊 Аналитика:\n"
-                "/tasksummary - сводка по задачам за неделю\n\n"
-                "🎯 Управление задачами:\n"
-                "/tasks - список задач по проектам\n"
-                "/active_task - просмотр активной задачи\n\n"
-                "/help - показать полную справку\n\n"
-            )
-
-            if rate > 0:
-                welcome_text += f"💰 Ваша текущая ставка: {rate} руб/час"
-            else:
-                welcome_text += "⚠️ Сначала установите свою ставку командой /setrate"
-
-            if WEBAPP_URL:
-                welcome_text += "\n\n🌐 Telegram Mini App: /app"
+            rate_line = WELCOME_RATE_LINE.format(rate=rate) if rate > 0 else WELCOME_NO_RATE_LINE
 
-            await message.answer(welcome_text)
+            await message.answer(WELCOME_TEXT + rate_line + WELCOME_APP_HINT)
 
         @self.dp.message(Command("app"))
         async def app_command(message: Message):
@@ -620,73 +781,28 @@ class SalaryBot:
 
         @self.dp.message(Command("help"))
         async def help_command(message: Message):
-            help_text = (
-                "📋 Справка по командам:\n\n"
-                "🏠 Основные команды:\n"
-                "/start - главное меню\n"
-                "/setrate - установить ставку (руб/час)\n"
-                "/goal [сумма] - цель заработка на месяц\n"
-                "/bonus - добавить премию\n"
-                "/bonuses - список премий за год\n"
-                "/today - заработок за сегодня\n"
-                "/yesterday - заработок за вчера\n"
-                "/week - заработок за неделю (с понедельника)\n"
-                "/weekdetails - детальный заработок по дням недели\n"
-                "/month - заработок за месяц\n"
-                "/monthweeks - заработок по неделям в месяце\n"
-                "/year - заработок по месяцам в году\n\n"
-                "🔗 ClickUp интеграция:\n"
-                "/clickup_setup - пошаговая настройка ClickUp\n"
-                "/clickup_token - установить Personal API Token\n"
-                "/clickup_workspace - установить Workspace ID\n"
-                "/clickup_reset - сбросить настройки ClickUp\n"
-                "/syncclickup - синхронизировать данные за сегодня\n"
-                "/synclast [дни] - синхронизировать за последние N дней (по умолчанию 7)\n"
-                "/clickupstatus - статус интеграции и активные таймеры\n"
-                "/notifications - автосинк и уведомления (дайджест, сводка, забытый таймер)\n\n"
-                "📊 Аналитика задач:\n"
-                "/tasksummary - сводка по задачам за неделю\n"
-                "/tasksummary today - сводка за сегодня\n"
-                "/tasksummary month - сводка за месяц\n"
-                "/tasksummary 7 - сводка за последние 7 дней\n\n"
-                "🎯 Управление задачами:\n"
-                "/tasks - просмотр всех задач с возможностью управления\n"
-                "/active_task - информация об активной задаче с таймером\n\n"
-                "💡 Для добавления времени используйте формат: ЧАСЫ МИНУТЫ\n"
-                "Например: 8 30 (означает 8 часов 30 минут)\n\n"
-                "🔄 ClickUp синхронизация автоматически объединяет данные из ClickUp с вашими ручными записями.\n"
-                "Каждый пользователь может настроить свои собственные ClickUp credentials."
-            )
-            await message.answer(help_text)
+            await message.answer(HELP_TEXT)
 
         @self.dp.message(Command("setrate"))
-        async def set_rate_command(message: Message, state: FSMContext):
+        async def set_rate_command(message: Message, state: FSMContext,
+                                   command: CommandObject, user_id: str):
+            # /setrate 500 — сразу, без лишнего шага через FSM
+            if command.args:
+                await self._set_rate_from_text(message, user_id, command.args)
+                return
             await message.answer("💰 Введите вашу ставку в рублях за час:")
             await state.set_state(SalaryStates.waiting_for_rate)
 
         @self.dp.message(SalaryStates.waiting_for_rate)
-        async def process_rate(message: Message, state: FSMContext):
-            try:
-                rate = float(message.text)
-                if rate <= 0:
-                    await message.answer("❌ Ставка должна быть положительным числом!")
-                    return
-
-                user_id = str(message.from_user.id)
-                self.data_manager.set_rate(user_id, rate)
-
-                await message.answer(f"✅ Ставка установлена: {rate} руб/час")
+        async def process_rate(message: Message, state: FSMContext, user_id: str):
+            if await self._set_rate_from_text(message, user_id, message.text or ""):
                 await state.clear()
 
-            except ValueError:
-                await message.answer("❌ Пожалуйста, введите корректное число!")
-
         @self.dp.message(Command("goal"))
-        async def goal_command(message: Message, state: FSMContext):
-            user_id = str(message.from_user.id)
-            parts = (message.text or "").split(maxsplit=1)
-            if len(parts) == 2:
-                await self._set_goal_from_text(message, user_id, parts[1])
+        async def goal_command(message: Message, state: FSMContext,
+                               command: CommandObject, user_id: str):
+            if command.args:
+                await self._set_goal_from_text(message, user_id, command.args)
                 return
             progress = self.data_manager.get_month_progress(user_id)
             if progress["goal"] > 0:
@@ -702,8 +818,7 @@ class SalaryBot:
             await state.set_state(SalaryStates.waiting_for_goal)
 
         @self.dp.message(SalaryStates.waiting_for_goal)
-        async def process_goal(message: Message, state: FSMContext):
-            user_id = str(message.from_user.id)
+        async def process_goal(message: Message, state: FSMContext, user_id: str):
             if await self._set_goal_from_text(message, user_id, message.text or ""):
                 await state.clear()
 
@@ -734,7 +849,7 @@ class SalaryBot:
 
         @self.dp.callback_query(F.data == "bonus_date_today", SalaryStates.waiting_for_bonus_date)
         async def bonus_date_today(callback: CallbackQuery, state: FSMContext):
-            await state.update_data(bonus_date=datetime.now().strftime("%Y-%m-%d"))
+            await state.update_data(bonus_date=date.today().isoformat())
             await self._ask_bonus_comment(callback.message, state)
             await callback.answer()
 
@@ -748,18 +863,17 @@ class SalaryBot:
             await self._ask_bonus_comment(message, state)
 
         @self.dp.callback_query(F.data == "bonus_skip_comment", SalaryStates.waiting_for_bonus_comment)
-        async def bonus_skip_comment(callback: CallbackQuery, state: FSMContext):
-            await self._save_bonus(callback.message, str(callback.from_user.id), state, None)
+        async def bonus_skip_comment(callback: CallbackQuery, state: FSMContext, user_id: str):
+            await self._save_bonus(callback.message, user_id, state, None)
             await callback.answer()
 
         @self.dp.message(SalaryStates.waiting_for_bonus_comment)
-        async def process_bonus_comment(message: Message, state: FSMContext):
+        async def process_bonus_comment(message: Message, state: FSMContext, user_id: str):
             comment = (message.text or "").strip() or None
-            await self._save_bonus(message, str(message.from_user.id), state, comment)
+            await self._save_bonus(message, user_id, state, comment)
 
         @self.dp.message(Command("bonuses"))
-        async def bonuses_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def bonuses_command(message: Message, user_id: str):
             year = datetime.now().year
             bonuses = self.data_manager.get_bonuses(
                 user_id, start_date=f"{year}-01-01", end_date=f"{year}-12-31"
@@ -771,7 +885,7 @@ class SalaryBot:
             lines = [f"🎁 Премии за {year} год (итого {total:.0f} руб):\n"]
             keyboard_rows = []
             for b in bonuses:
-                date_h = datetime.strptime(b["date"], "%Y-%m-%d").strftime("%d.%m.%Y")
+                date_h = date.fromisoformat(b["date"]).strftime("%d.%m.%Y")
                 comment = f" — {b['comment']}" if b["comment"] else ""
                 lines.append(f"• {date_h}: {b['amount']:.0f} руб{comment}")
                 keyboard_rows.append([InlineKeyboardButton(
@@ -784,8 +898,7 @@ class SalaryBot:
             )
 
         @self.dp.callback_query(F.data.startswith("bonus_del_"))
-        async def bonus_delete_callback(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def bonus_delete_callback(callback: CallbackQuery, user_id: str):
             bonus_id = int(callback.data.removeprefix("bonus_del_"))
             if self.data_manager.delete_bonus(user_id, bonus_id):
                 await callback.answer("Премия удалена")
@@ -796,15 +909,13 @@ class SalaryBot:
                 await callback.answer("Премия не найдена", show_alert=True)
 
         @self.dp.message(Command("notifications"))
-        async def notifications_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def notifications_command(message: Message, user_id: str):
             settings = self.data_manager.get_notification_settings(user_id)
             text, keyboard = build_notifications_view(settings)
             await message.answer(text, reply_markup=keyboard)
 
         @self.dp.callback_query(F.data.startswith("notif_toggle_"))
-        async def notif_toggle_callback(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def notif_toggle_callback(callback: CallbackQuery, user_id: str):
             key = callback.data.removeprefix("notif_toggle_")
             field = NOTIF_TOGGLE_FIELDS.get(key)
             if not field:
@@ -828,14 +939,13 @@ class SalaryBot:
             await callback.answer()
 
         @self.dp.message(SalaryStates.waiting_for_digest_time)
-        async def process_digest_time(message: Message, state: FSMContext):
+        async def process_digest_time(message: Message, state: FSMContext, user_id: str):
             value = (message.text or "").strip()
-            if not valid_hhmm(value):
+            parsed = parse_hhmm(value)
+            if parsed is None:
                 await message.answer("❌ Неверный формат. Введите время как ЧЧ:ММ, например 21:00")
                 return
-            user_id = str(message.from_user.id)
-            hours, minutes = value.split(":")
-            normalized = f"{int(hours):02d}:{int(minutes):02d}"
+            normalized = "%02d:%02d" % parsed
             self.data_manager.set_notification_settings(user_id, digest_time=normalized)
             await state.clear()
             settings = self.data_manager.get_notification_settings(user_id)
@@ -868,14 +978,13 @@ class SalaryBot:
             await state.set_state(SalaryStates.waiting_for_clickup_token)
 
         @self.dp.message(SalaryStates.waiting_for_clickup_token)
-        async def process_clickup_token(message: Message, state: FSMContext):
-            token = message.text.strip()
+        async def process_clickup_token(message: Message, state: FSMContext, user_id: str):
+            token = (message.text or "").strip()
 
-            if not token.startswith('pk_') or len(token) < 20:
+            if not _CLICKUP_TOKEN_RE.fullmatch(token):
                 await message.answer("❌ Неверный формат токена! Токен должен начинаться с 'pk_' и содержать не менее 20 символов.")
                 return
 
-            user_id = str(message.from_user.id)
             self.data_manager.set_clickup_settings(user_id, api_token=token)
 
             await message.answer("✅ API Token сохранен!\n\n"
@@ -890,23 +999,23 @@ class SalaryBot:
             await state.set_state(SalaryStates.waiting_for_workspace_id)
 
         @self.dp.message(SalaryStates.waiting_for_workspace_id)
-        async def process_workspace_id(message: Message, state: FSMContext):
-            workspace_id = message.text.strip()
+        async def process_workspace_id(message: Message, state: FSMContext, user_id: str):
+            workspace_id = (message.text or "").strip()
 
-            if not workspace_id.isdigit() or len(workspace_id) < 8:
+            if not _WORKSPACE_ID_RE.fullmatch(workspace_id):
                 await message.answer("❌ Неверный формат Workspace ID! ID должен содержать только цифры и быть не менее 8 символов.")
                 return
 
-            user_id = str(message.from_user.id)
-
             api_token = self.data_manager.get_clickup_settings(user_id).get("api_token")
             if not api_token:
                 await message.answer("❌ Сначала установите API токен командой /clickup_token")
                 return
 
-            await message.answer("🔄 Проверяю подключение к ClickUp...")
-
-            validation_result = await self.data_manager.validate_clickup_credentials(api_token, workspace_id)
+            # Сообщение о проверке уходит в Telegram параллельно с запросами к ClickUp
+            _, validation_result = await asyncio.gather(
+                message.answer("🔄 Проверяю подключение к ClickUp..."),
+                self.data_manager.validate_clickup_credentials(api_token, workspace_id),
+            )
 
             if validation_result["success"]:
                 self.data_manager.set_clickup_settings(
@@ -932,20 +1041,18 @@ class SalaryBot:
             await state.clear()
 
         @self.dp.message(Command("clickup_reset"))
-        async def clickup_reset_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def clickup_reset_command(message: Message, user_id: str):
             self.data_manager.clear_clickup_settings(user_id)
 
             await message.answer("🗑 Настройки ClickUp сброшены.\n\n"
                                  "Для повторной настройки используйте /clickup_setup")
 
         @self.dp.message(Command("clickup_refresh"))
-        async def clickup_refresh_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def clickup_refresh_command(message: Message, user_id: str):
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             await message.answer("🔄 Обновляю информацию о пользователе ClickUp...")
@@ -978,12 +1085,11 @@ class SalaryBot:
                                      f"Попробуйте позже или обратитесь к администратору.")
 
         @self.dp.message(Command("tasksummary"))
-        async def task_summary_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def task_summary_command(message: Message, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await message.answer("❌ Сначала установите ставку командой /setrate")
+                await message.answer(RATE_REQUIRED_TEXT)
                 return
 
             command_parts = message.text.strip().split()
@@ -1007,8 +1113,7 @@ class SalaryBot:
                         period_name = f"последние {days} дней"
 
                         await message.answer(f"📊 Анализирую задачи за {period_name}...")
-                        summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-                        formatted_summary = self.data_manager.format_task_summary(summary)
+                        formatted_summary = await self._tasks_summary_text(user_id, start_date, end_date)
                         await self.send_tasks_analytics_report(message, "custom", formatted_summary, show_navigation=False)
                         return
                 else:
@@ -1027,25 +1132,22 @@ class SalaryBot:
 
             await message.answer(f"📊 Анализирую задачи за {period_name}...")
 
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-
-            formatted_summary = self.data_manager.format_task_summary(summary)
+            formatted_summary = await self._tasks_summary_text(user_id, start_date, end_date)
             await self.send_tasks_analytics_report(message, period, formatted_summary)
 
         @self.dp.message(Command("syncclickup"))
-        async def sync_clickup_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def sync_clickup_command(message: Message, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if not self.data_manager.get_user_clickup_client(user_id):
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             if rate <= 0:
-                await message.answer("❌ Сначала установите ставку командой /setrate")
+                await message.answer(RATE_REQUIRED_TEXT)
                 return
 
-            await message.answer("🔄 Синхронизирую данные ClickUp за сегодня...")
+            status_message = await message.answer("🔄 Синхронизирую данные ClickUp за сегодня...")
 
             today = datetime.now()
             start_of_today = today.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -1065,19 +1167,19 @@ class SalaryBot:
             else:
                 response = f"❌ Ошибка синхронизации: {result['error']}"
 
-            await message.answer(response)
+            # Итог заменяет сообщение «Синхронизирую...» вместо второго сообщения в чат
+            await edit_status_or_answer(status_message, message, response)
 
         @self.dp.message(Command("synclast"))
-        async def sync_last_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def sync_last_command(message: Message, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if not self.data_manager.get_user_clickup_client(user_id):
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             if rate <= 0:
-                await message.answer("❌ Сначала установите ставку командой /setrate")
+                await message.answer(RATE_REQUIRED_TEXT)
                 return
 
             command_parts = message.text.strip().split()
@@ -1085,14 +1187,14 @@ class SalaryBot:
             if len(command_parts) > 1:
                 try:
                     days = int(command_parts[1])
-                    if days <= 0 or days > 30:
-                        await message.answer("❌ Количество дней должно быть от 1 до 30")
+                    if days <= 0 or days > MAX_SYNC_DAYS:
+                        await message.answer(f"❌ Количество дней должно быть от 1 до {MAX_SYNC_DAYS}")
                         return
                 except ValueError:
                     await message.answer("❌ Введите корректное количество дней")
                     return
 
-            await message.answer(f"🔄 Синхронизирую данные ClickUp за последние {days} дней...")
+            status_message = await message.answer(f"🔄 Синхронизирую данные ClickUp за последние {days} дней...")
 
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
@@ -1113,15 +1215,14 @@ class SalaryBot:
             else:
                 response = f"❌ Ошибка синхронизации: {result['error']}"
 
-            await message.answer(response)
+            await edit_status_or_answer(status_message, message, response)
 
         @self.dp.message(Command("clickupstatus"))
-        async def clickup_status_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def clickup_status_command(message: Message, user_id: str):
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             await message.answer("🔍 Проверяю статус ClickUp...")
@@ -1165,68 +1266,14 @@ class SalaryBot:
 
             await message.answer(response)
 
-        @self.dp.message(Command("today"))
-        async def today_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_today_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "today", content)
-
-        @self.dp.message(Command("yesterday"))
-        async def yesterday_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_yesterday_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "yesterday", content)
-
-        @self.dp.message(Command("week"))
-        async def week_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_week_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "week", content)
-
-        @self.dp.message(Command("weekdetails"))
-        async def week_details_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_week_details_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "week_details", content)
-
-        @self.dp.message(Command("month"))
-        async def month_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.month_report_with_bonuses(user_id)
-            await self.send_earnings_report(message, "month", content)
-
-        @self.dp.message(Command("monthweeks"))
-        async def month_weeks_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_month_weeks_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "month_weeks", content)
-
-        @self.dp.message(Command("prevmonthweeks"))
-        async def prev_month_weeks_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_prev_month_weeks_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "prev_month_weeks", content)
-
-        @self.dp.message(Command("year"))
-        async def year_command(message: Message):
-            user_id = str(message.from_user.id)
-            content = self.data_manager.generate_year_report(
-                self.data_manager.get_work_sessions(user_id))
-            await self.send_earnings_report(message, "year", content)
+        self.dp.message.register(self.earnings_command, Command(*EARNINGS_COMMANDS))
 
         @self.dp.message(Command("tasks"))
-        async def tasks_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def tasks_command(message: Message, user_id: str):
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             await message.answer("🔄 Загружаю рабочие пространства из ClickUp...")
@@ -1269,12 +1316,11 @@ class SalaryBot:
             )
 
         @self.dp.message(Command("active_task"))
-        async def active_task_command(message: Message):
-            user_id = str(message.from_user.id)
+        async def active_task_command(message: Message, user_id: str):
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await message.answer("❌ ClickUp не настроен для вашего аккаунта\n\nИспользуйте /clickup_setup для настройки")
+                await message.answer(CLICKUP_NOT_CONFIGURED_TEXT)
                 return
 
             await message.answer("🔍 Проверяю активные таймеры...")
@@ -1329,13 +1375,12 @@ class SalaryBot:
 
         # Callback handlers
         @self.dp.callback_query(F.data.startswith("task_info_"))
-        async def handle_task_info(callback: CallbackQuery):
+        async def handle_task_info(callback: CallbackQuery, user_id: str):
             task_id = callback.data.split("_")[-1]
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             task_details = await clickup_client.get_task_details(task_id)
@@ -1357,13 +1402,12 @@ class SalaryBot:
             await callback.answer()
 
         @self.dp.callback_query(F.data.startswith("task_back_"))
-        async def handle_task_back(callback: CallbackQuery):
+        async def handle_task_back(callback: CallbackQuery, user_id: str):
             task_id = callback.data.split("_")[-1]
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             task_details = await clickup_client.get_task_details(task_id)
@@ -1389,13 +1433,12 @@ class SalaryBot:
             await callback.answer()
 
         @self.dp.callback_query(F.data.startswith("timer_start_"))
-        async def handle_timer_start(callback: CallbackQuery):
+        async def handle_timer_start(callback: CallbackQuery, user_id: str):
             task_id = callback.data.split("_")[-1]
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("⏱️ Запуск таймера...")
@@ -1419,13 +1462,12 @@ class SalaryBot:
                 await callback.message.edit_text("❌ Не удалось запустить таймер")
 
         @self.dp.callback_query(F.data.startswith("timer_stop_"))
-        async def handle_timer_stop(callback: CallbackQuery):
+        async def handle_timer_stop(callback: CallbackQuery, user_id: str):
             task_id = callback.data.split("_")[-1]
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("⏹️ Остановка таймера...")
@@ -1449,16 +1491,15 @@ class SalaryBot:
                 await callback.message.edit_text("❌ Не удалось остановить таймер")
 
         @self.dp.callback_query(F.data.startswith("task_status_"))
-        async def handle_status_change(callback: CallbackQuery):
+        async def handle_status_change(callback: CallbackQuery, user_id: str):
             parts = callback.data.split("_")
             new_status = parts[2]
             task_id = parts[3]
 
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer(f"🔄 Изменение статуса на {new_status}...")
@@ -1483,13 +1524,12 @@ class SalaryBot:
                 await callback.message.edit_text("❌ Не удалось изменить статус")
 
         @self.dp.callback_query(F.data.startswith("space_select_"))
-        async def handle_space_select(callback: CallbackQuery):
+        async def handle_space_select(callback: CallbackQuery, user_id: str):
             space_id = callback.data.split("_", 2)[2]
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("📁 Загрузка папок...")
@@ -1617,16 +1657,15 @@ class SalaryBot:
             )
 
         @self.dp.callback_query(F.data.startswith("folder_select_"))
-        async def handle_folder_select(callback: CallbackQuery):
+        async def handle_folder_select(callback: CallbackQuery, user_id: str):
             parts = callback.data.split("_", 3)
             space_id = parts[2]
             folder_id = parts[3]
 
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("📋 Загрузка списков...")
@@ -1694,17 +1733,16 @@ class SalaryBot:
             )
 
         @self.dp.callback_query(F.data.startswith("list_select_"))
-        async def handle_list_select(callback: CallbackQuery):
+        async def handle_list_select(callback: CallbackQuery, user_id: str):
             parts = callback.data.split("_", 4)
             space_id = parts[2]
             folder_id = parts[3] if parts[3] != 'none' else None
             list_id = parts[4]
 
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("🔄 Загрузка всех задач проекта...")
@@ -1784,17 +1822,16 @@ class SalaryBot:
                 await callback.message.edit_text(f"❌ Ошибка загрузки задач: {str(e)}")
 
         @self.dp.callback_query(F.data.startswith("task_nav_prev_"))
-        async def handle_task_nav_prev(callback: CallbackQuery):
+        async def handle_task_nav_prev(callback: CallbackQuery, user_id: str):
             parts = callback.data.split("_")
             list_id = parts[3]
             current_index = int(parts[4])
             prev_index = int(parts[5])
 
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("◀️ Предыдущая задача")
@@ -1812,17 +1849,16 @@ class SalaryBot:
                 await callback.message.edit_text(f"❌ Ошибка: {str(e)}")
 
         @self.dp.callback_query(F.data.startswith("task_nav_next_"))
-        async def handle_task_nav_next(callback: CallbackQuery):
+        async def handle_task_nav_next(callback: CallbackQuery, user_id: str):
             parts = callback.data.split("_")
             list_id = parts[3]
             current_index = int(parts[4])
             next_index = int(parts[5])
 
-            user_id = str(callback.from_user.id)
             clickup_client = self.data_manager.get_user_clickup_client(user_id)
 
             if not clickup_client:
-                await callback.answer("❌ ClickUp не настроен", show_alert=True)
+                await callback.answer(CLICKUP_NOT_CONFIGURED_ALERT, show_alert=True)
                 return
 
             await callback.answer("▶️ Следующая задача")
@@ -1874,183 +1910,97 @@ class SalaryBot:
             )
 
         # Earnings report callbacks
-        @self.dp.callback_query(F.data == "earnings_today")
-        async def handle_earnings_today(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_today_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("today")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_yesterday")
-        async def handle_earnings_yesterday(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_yesterday_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("yesterday")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_week")
-        async def handle_earnings_week(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_week_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("week")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_month")
-        async def handle_earnings_month(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.month_report_with_bonuses(user_id)
-
-            keyboard = self.create_earnings_keyboard("month")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_week_details")
-        async def handle_earnings_week_details(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_week_details_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("week_details")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_month_weeks")
-        async def handle_earnings_month_weeks(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_month_weeks_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("month_weeks")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_prev_month_weeks")
-        async def handle_earnings_prev_month_weeks(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_prev_month_weeks_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("prev_month_weeks")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
-
-        @self.dp.callback_query(F.data == "earnings_year")
-        async def handle_earnings_year(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
-            content = self.data_manager.generate_year_report(
-                self.data_manager.get_work_sessions(user_id))
-
-            keyboard = self.create_earnings_keyboard("year")
-            await callback.message.edit_text(content, reply_markup=keyboard)
-            await callback.answer()
+        self.dp.callback_query.register(
+            self.earnings_callback,
+            F.data.in_({f"earnings_{t}" for t in EARNINGS_COMMANDS.values()}),
+        )
 
         # Task analytics callbacks
         @self.dp.callback_query(F.data == "tasks_summary_today")
-        async def handle_tasks_summary_today(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_today(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("today")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("today")
             await callback.message.edit_text(content, reply_markup=keyboard)
             await callback.answer()
 
         @self.dp.callback_query(F.data == "tasks_summary_yesterday")
-        async def handle_tasks_summary_yesterday(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_yesterday(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("yesterday")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("yesterday")
             await callback.message.edit_text(content, reply_markup=keyboard)
             await callback.answer()
 
         @self.dp.callback_query(F.data == "tasks_summary_week")
-        async def handle_tasks_summary_week(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_week(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("week")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("week")
             await callback.message.edit_text(content, reply_markup=keyboard)
             await callback.answer()
 
         @self.dp.callback_query(F.data == "tasks_summary_month")
-        async def handle_tasks_summary_month(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_month(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("month")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("month")
             await callback.message.edit_text(content, reply_markup=keyboard)
             await callback.answer()
 
         @self.dp.callback_query(F.data == "tasks_summary_7days")
-        async def handle_tasks_summary_7days(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_7days(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("7days")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("7days")
             await callback.message.edit_text(content, reply_markup=keyboard)
             await callback.answer()
 
         @self.dp.callback_query(F.data == "tasks_summary_30days")
-        async def handle_tasks_summary_30days(callback: CallbackQuery):
-            user_id = str(callback.from_user.id)
+        async def handle_tasks_summary_30days(callback: CallbackQuery, user_id: str):
             rate = self.data_manager.get_rate(user_id)
 
             if rate <= 0:
-                await callback.answer("❌ Сначала установите ставку командой /setrate", show_alert=True)
+                await callback.answer(RATE_REQUIRED_TEXT, show_alert=True)
                 return
 
             start_date, end_date, period_name = self.data_manager.get_tasks_summary_by_period("30days")
-            summary = self.data_manager.get_tasks_summary(user_id, start_date, end_date)
-            content = self.data_manager.format_task_summary(summary)
+            content = await self._tasks_summary_text(user_id, start_date, end_date)
 
             keyboard = self.create_tasks_analytics_keyboard("30days")
             await callback.message.edit_text(content, reply_markup=keyboard)
@@ -2077,7 +2027,10 @@ class SalaryBot:
 
 async def main():
     bot = SalaryBot(BOT_TOKEN)
-    await bot.start_bot()
+    try:
+        await bot.start_bot()
+    finally:
+        await bot.data_manager.close_clickup_clients()
 
 
 if __name__ == "__main__":
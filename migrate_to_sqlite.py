@@ -1,8 +1,8 @@
-import json
 import logging
 import os
 from datetime import datetime
 
+import orjson
 from dotenv import load_dotenv
 
 import crypto
@@ -135,8 +135,8 @@ def migrate(json_path: str = DATA_FILE, db_path: str = DB_FILE) -> bool:
     if not os.path.exists(json_path):
         return False
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(json_path, "rb") as f:
+        data = orjson.loads(f.read())
 
     tmp_path = f"{db_path}.{os.getpid()}.tmp"                # уникальный tmp на процесс
     if os.path.exists(tmp_path):
@@ -144,10 +144,13 @@ def migrate(json_path: str = DATA_FILE, db_path: str = DB_FILE) -> bool:
 
     conn = db.get_connection(tmp_path)
     try:
+        # Весь импорт одной транзакцией: один коммит вместо коммита на каждую строку
+        conn.execute("BEGIN")
         for user_id, user in data.items():
             _insert_user(conn, user_id, user)
             _insert_sessions(conn, user_id, user.get("work_sessions", {}))
             _insert_synced(conn, user_id, user.get("clickup_synced_entries", []) or [])
+        conn.execute("COMMIT")
         _verify(conn, data)
     except Exception:
         conn.close()
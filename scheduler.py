@@ -7,10 +7,13 @@
 import asyncio
 import logging
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, Optional
 from zoneinfo import ZoneInfo
 
+from data_manager import earnings_period_start
+
 logger = logging.getLogger(__name__)
 
 KIND_DAILY = "daily"
@@ -18,6 +21,8 @@ KIND_WEEKLY = "weekly"
 KIND_LONG_TIMER = "long_timer"
 
 MS_PER_HOUR = 3_600_000
+# Telegram допускает ~30 сообщений в секунду на бота — рассылку держим чуть ниже
+NOTIFY_MIN_INTERVAL = 1 / 25
 
 
 def now_local() -> datetime:
@@ -64,6 +69,7 @@ class BackgroundScheduler:
         )
         self._last_sync: Dict[str, datetime] = {}
         self._last_timer_check: Dict[str, datetime] = {}
+        self._next_send_at = 0.0
 
     async def run(self) -> None:
         logger.info("Background scheduler started (tick %ss)", self.tick_seconds)
@@ -114,7 +120,7 @@ class BackgroundScheduler:
         except Exception:
             logger.exception("Digest pre-sync failed for %s", user_id)
 
-        day = self.dm.get_work_sessions(user_id).get(today_ref)
+        day = self.dm.get_daily_totals(user_id, today_ref, today_ref).get(today_ref)
         if day:
             time_str = self.dm.format_hours_minutes(day["total_hours"])
             text = (
@@ -134,7 +140,9 @@ class BackgroundScheduler:
         await self._notify(user_id, KIND_DAILY, today_ref, text)
 
     async def _send_weekly_summary(self, user_id: str, now: datetime) -> None:
-        work_sessions = self.dm.get_work_sessions(user_id)
+        # Отчёт строится от date.today() — от неё же и ограничиваем выборку
+        work_sessions = self.dm.get_daily_totals(
+            user_id, earnings_period_start("week_details", date.today()))
         text = self.dm.generate_week_details_report(work_sessions)
         await self._notify(user_id, KIND_WEEKLY, week_ref(now), text)
 
@@ -168,9 +176,32 @@ class BackgroundScheduler:
 
         Отметка ставится и при TelegramForbiddenError (бот заблокирован),
         чтобы не ретраить отправку каждый тик."""
+        await self._pace_send()
         try:
-            await self.bot.send_message(chat_id=int(user_id), text=text)
+            await self._send(user_id, text)
         except Exception as e:
             if type(e).__name__ != "TelegramForbiddenError":
                 raise
         self.dm.mark_notified(user_id, kind, ref)
+
+    async def _pace_send(self) -> None:
+        """Не чаще NOTIFY_MIN_INTERVAL между отправками, чтобы вечерняя рассылка
+        дайджестов не упиралась в лимит Telegram."""
+        now = time.monotonic()
+        if self._next_send_at > now:
+            await asyncio.sleep(self._next_send_at - now)
+            now = self._next_send_at
+        self._next_send_at = now + NOTIFY_MIN_INTERVAL
+
+    async def _send(self, user_id: str, text: str) -> None:
+        try:
+            await self.bot.send_message(chat_id=int(user_id), text=text)
+        except Exception as e:
+            # Flood control: один повтор после паузы, которую назвал Telegram
+            retry_after = getattr(e, "retry_after", None)
+            if type(e).__name__ != "TelegramRetryAfter" or retry_after is None:
+                raise
+            logger.warning("Telegram flood control, retrying in %ss", retry_after)
+            await asyncio.sleep(retry_after)
+            self._next_send_at = time.monotonic() + NOTIFY_MIN_INTERVAL
+            await self.bot.send_message(chat_id=int(user_id), text=text)
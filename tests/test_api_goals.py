@@ -88,5 +88,7 @@ def test_notification_settings_endpoint():
 
         assert client.put("/user/notifications",
                           json={"digest_time": "25:99"}).status_code == 400
+        resp = client.put("/user/notifications", json={"digest_time": "9:05"})
+        assert resp.json()["digest_time"] == "09:05"
     finally:
         _cleanup()
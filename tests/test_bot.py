@@ -0,0 +1,26 @@
+import main
+
+
+async def test_edit_status_falls_back_to_answer_when_edit_fails():
+    from aiogram.exceptions import TelegramBadRequest
+    from aiogram.methods import EditMessageText
+
+    class Msg:
+        def __init__(self, fail=False):
+            self.fail, self.edited, self.answered = fail, [], []
+
+        async def edit_text(self, text):
+            if self.fail:
+                raise TelegramBadRequest(EditMessageText(text=text), "message to edit not found")
+            self.edited.append(text)
+
+        async def answer(self, text):
+            self.answered.append(text)
+
+    status, message = Msg(), Msg()
+    await main.edit_status_or_answer(status, message, "✅ готово")
+    assert status.edited == ["✅ готово"] and message.answered == []
+
+    status, message = Msg(fail=True), Msg()
+    await main.edit_status_or_answer(status, message, "✅ готово")
+    assert message.answered == ["✅ готово"]
@@ -0,0 +1,213 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import clickup_client
+from clickup_client import ClickUpClient, RateLimitError, retry_with_backoff
+
+
+@asynccontextmanager
+async def _serve(routes):
+    """ClickUpClient, направленный на локальный aiohttp-сервер с заданными маршрутами."""
+    app = web.Application()
+    for path, handler in routes.items():
+        app.router.add_route("*", path, handler)
+    server = TestServer(app)
+    await server.start_server()
+    client = ClickUpClient("pk_test", "9", team_id="9")
+    client.base_url = str(server.make_url(""))
+    try:
+        yield client
+    finally:
+        await client.close()
+        await server.close()
+
+
+def _record_sleeps(monkeypatch):
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        if delay:
+            sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return sleeps
+
+
+async def test_429_raises_rate_limit_error_with_retry_after():
+    async def limited(request):
+        return web.Response(status=429, headers={"Retry-After": "7"})
+
+    async with _serve({"/team": limited}) as client:
+        with pytest.raises(RateLimitError) as exc:
+            async with client._request("GET", f"{client.base_url}/team"):
+                pass
+    assert exc.value.retry_after == 7.0
+
+
+async def test_429_is_retried_after_retry_after(monkeypatch):
+    hits = []
+
+    async def team(request):
+        hits.append(1)
+        if len(hits) == 1:
+            return web.Response(status=429, headers={"Retry-After": "5"})
+        return web.json_response({"teams": [{"id": "9"}]})
+
+    sleeps = _record_sleeps(monkeypatch)
+    async with _serve({"/team": team}) as client:
+        client.team_id = None
+        assert await client.get_team_id() == "9"
+    assert len(hits) == 2
+    assert sleeps == [5.0]
+
+
+async def test_exhausted_rate_limit_pauses_until_reset(monkeypatch):
+    async def team(request):
+        return web.json_response(
+            {"teams": [{"id": "9"}]},
+            headers={"X-RateLimit-Remaining": "0",
+                     "X-RateLimit-Reset": str(int(time.time()) + 3)},
+        )
+
+    sleeps = _record_sleeps(monkeypatch)
+    async with _serve({"/team": team}) as client:
+        client.team_id = None
+        assert await client.get_team_id() == "9"
+    assert len(sleeps) == 1
+    assert 0 < sleeps[0] <= 3
+
+
+def test_request_limit_works_across_event_loops():
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return web.json_response({"teams": [{"id": "9"}]})
+
+    async def saturate_limit():
+        async with _serve({"/team": slow}) as client:
+            async def fetch():
+                async with client._request("GET", f"{client.base_url}/team") as response:
+                    return response.status
+            # На один запрос больше лимита — кто-то обязательно ждёт на семафоре
+            n = clickup_client.MAX_CONCURRENT_REQUESTS + 1
+            return await asyncio.gather(*(fetch() for _ in range(n)))
+
+    # Второй цикл (как API рядом с ботом или следующий asyncio.run) не должен
+    # упереться в семафор, на котором уже ждали в первом
+    n = clickup_client.MAX_CONCURRENT_REQUESTS + 1
+    assert asyncio.run(saturate_limit()) == [200] * n
+    assert asyncio.run(saturate_limit()) == [200] * n
+
+
+async def test_retry_with_backoff_retries_timeouts(monkeypatch):
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    sleeps = _record_sleeps(monkeypatch)
+    assert await retry_with_backoff(flaky) == "ok"
+    assert sleeps == [1, 2]
+
+
+async def test_5xx_is_retried(monkeypatch):
+    hits = []
+
+    async def flaky_list(request):
+        hits.append(1)
+        if len(hits) == 1:
+            return web.Response(status=503, text="unavailable")
+        return web.json_response({"id": "1", "name": "Проект"})
+
+    sleeps = _record_sleeps(monkeypatch)
+    async with _serve({"/list/1": flaky_list}) as client:
+        assert (await client.get_list("1"))["name"] == "Проект"
+    assert len(hits) == 2
+    assert sleeps == [1]
+
+
+async def test_404_is_not_retried(monkeypatch):
+    hits = []
+
+    async def missing(request):
+        hits.append(1)
+        return web.Response(status=404, text="not found")
+
+    sleeps = _record_sleeps(monkeypatch)
+    async with _serve({"/list/1": missing}) as client:
+        assert await client.get_list("1") is None
+    assert len(hits) == 1
+    assert sleeps == []
+
+
+async def test_error_text_is_truncated():
+    async def huge_error(request):
+        return web.Response(status=500, text="x" * 10_000)
+
+    async with _serve({"/list/1": huge_error}) as client:
+        async with client._request("GET", f"{client.base_url}/list/1") as response:
+            error = await clickup_client._http_error(response)
+    assert str(error) == "HTTP 500: " + "x" * clickup_client.MAX_ERROR_BODY
+
+
+async def test_current_timer_empty_data_is_none():
+    hits = []
+
+    async def current(request):
+        hits.append(1)
+        return web.json_response({"data": None})
+
+    async with _serve({"/team/9/time_entries/current": current}) as client:
+        assert await client.get_current_timer() is None
+        assert await client.get_current_timer() is None
+    assert len(hits) == 1                                   # второй вызов — из кэша
+
+
+async def test_current_timer_falls_back_to_recent_entries(monkeypatch):
+    async def broken(request):
+        return web.Response(status=500, text="boom")
+
+    async def entries(request):
+        return web.json_response({"data": [
+            {"id": "done", "duration": "60000"},
+            {"id": "running", "duration": "-1700000000000"},
+        ]})
+
+    _record_sleeps(monkeypatch)
+    async with _serve({"/team/9/time_entries/current": broken,
+                       "/team/9/time_entries": entries}) as client:
+        timer = await client.get_current_timer()
+    assert timer["id"] == "running"
+
+
+async def test_start_and_stop_timer_clear_the_timer_cache():
+    state = {"timer": {"id": "a"}}
+
+    async def current(request):
+        return web.json_response({"data": state["timer"]})
+
+    async def start(request):
+        state["timer"] = {"id": "b"}
+        return web.json_response({})
+
+    async def stop(request):
+        state["timer"] = None
+        return web.json_response({})
+
+    async with _serve({"/team/9/time_entries/current": current,
+                       "/team/9/time_entries/start": start,
+                       "/team/9/time_entries/stop": stop}) as client:
+        assert (await client.get_current_timer())["id"] == "a"
+        assert await client.start_timer("task1") is True
+        assert (await client.get_current_timer())["id"] == "b"
+        assert await client.stop_timer() is True
+        assert await client.get_current_timer() is None
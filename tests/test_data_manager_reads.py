@@ -23,6 +23,19 @@ def test_is_entry_synced_false_when_absent(tmp_path, monkeypatch):
     assert dm.is_entry_synced("42", "e1") is False
 
 
+def test_synced_entry_ids_only_for_requested_ids(tmp_path, monkeypatch):
+    import data_manager
+    dm = _dm(tmp_path, monkeypatch)
+    for eid in ("e1", "e2", "e3"):
+        dm.add_synced_session("42", eid, "2026-07-04", {"duration_ms": 1000, "earnings": 1.0})
+    dm.add_synced_session("7", "e4", "2026-07-04", {"duration_ms": 1000, "earnings": 1.0})
+
+    assert dm.get_synced_entry_ids("42", ["e1", "e3", "e4", "new"]) == {"e1", "e3"}
+    assert dm.get_synced_entry_ids("42", []) == set()
+    monkeypatch.setattr(data_manager, "SYNCED_IDS_BATCH", 2)
+    assert dm.get_synced_entry_ids("42", ["e1", "x", "e2", "y", "e3"]) == {"e1", "e2", "e3"}
+
+
 def test_read_from_another_thread(tmp_path, monkeypatch):
     import threading
     dm = _dm(tmp_path, monkeypatch)
@@ -33,3 +46,56 @@ def test_read_from_another_thread(tmp_path, monkeypatch):
     t = threading.Thread(target=worker)
     t.start(); t.join()
     assert result["rate"] == 0
+
+
+def test_daily_totals_aggregate_per_day_and_filter_range(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    for eid, date, ms, earnings in [
+        ("e1", "2026-07-03", 30 * 60 * 1000, 250.0),
+        ("e2", "2026-07-04", 60 * 60 * 1000, 500.0),
+        ("e3", "2026-07-04", 30 * 60 * 1000, 250.0),
+    ]:
+        dm.add_synced_session("42", eid, date, {"duration_ms": ms, "earnings": earnings})
+
+    totals = dm.get_daily_totals("42")
+    assert set(totals) == {"2026-07-03", "2026-07-04"}
+    assert abs(totals["2026-07-04"]["total_hours"] - 1.5) < 1e-9
+    assert totals["2026-07-04"]["total_earnings"] == 750.0
+
+    ranged = dm.get_daily_totals("42", start_date="2026-07-04", end_date="2026-07-31")
+    assert set(ranged) == {"2026-07-04"}
+
+
+def test_work_sessions_filter_range(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    for eid, date in [("e1", "2026-07-03"), ("e2", "2026-07-04"), ("e3", "2026-07-05")]:
+        dm.add_synced_session("42", eid, date, {"duration_ms": 60 * 60 * 1000, "earnings": 500.0})
+
+    ranged = dm.get_work_sessions("42", "2026-07-04", "2026-07-04")
+    assert set(ranged) == {"2026-07-04"}
+    assert len(ranged["2026-07-04"]["sessions"]) == 1
+    assert set(dm.get_work_sessions("42", start_date="2026-07-04")) == {"2026-07-04", "2026-07-05"}
+
+
+def test_monthly_totals_feed_the_year_report(tmp_path, monkeypatch):
+    from datetime import date
+    dm = _dm(tmp_path, monkeypatch)
+    year = date.today().year
+    for eid, day in [("e1", f"{year}-01-10"), ("e2", f"{year}-01-20"), ("e3", f"{year - 1}-12-31")]:
+        dm.add_synced_session("42", eid, day, {"duration_ms": 60 * 60 * 1000, "earnings": 500.0})
+
+    monthly = dm.get_monthly_totals("42")
+    assert monthly[f"{year}-01"] == {"total_hours": 2.0, "total_earnings": 1000.0}
+    assert set(monthly) == {f"{year}-01", f"{year - 1}-12"}
+    assert dm.generate_year_report(monthly) == dm.generate_year_report(dm.get_daily_totals("42"))
+
+
+def test_year_report_keeps_fractional_minutes(tmp_path, monkeypatch):
+    from datetime import date
+    dm = _dm(tmp_path, monkeypatch)
+    day = f"{date.today().year}-01-10"
+    # 14ч 44м: в часах это 14.7333…, и отсечение минут давало 43м
+    dm.add_synced_session("42", "e1", day, {"duration_ms": 53_040_000, "earnings": 500.0})
+
+    assert "14ч 44м" in dm.generate_year_report(dm.get_monthly_totals("42"))
+    assert dm.format_hours_minutes(dm.get_daily_totals("42")[day]["total_hours"]) == "14ч 44м"
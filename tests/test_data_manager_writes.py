@@ -38,6 +38,18 @@ def test_clear_clickup_settings(tmp_path, monkeypatch):
     assert s["api_token"] is None and s["workspace_id"] is None
 
 
+def test_clickup_client_reused_until_credentials_change(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    dm.set_clickup_settings("42", api_token="pk_SECRET", workspace_id="ws1")
+    client = dm.get_user_clickup_client("42")
+    assert dm.get_user_clickup_client("42") is client
+    dm.set_clickup_settings("42", api_token="pk_OTHER", workspace_id="ws1")
+    other = dm.get_user_clickup_client("42")
+    assert other is not client and other.api_token == "pk_OTHER"
+    dm.clear_clickup_settings("42")
+    assert dm.get_user_clickup_client("42") is None
+
+
 def test_add_synced_session_aggregates_and_dedups(tmp_path, monkeypatch):
     dm = _dm(tmp_path, monkeypatch)
     added1 = dm.add_synced_session("42", "e1", "2026-07-04",
@@ -53,6 +65,20 @@ def test_add_synced_session_aggregates_and_dedups(tmp_path, monkeypatch):
     assert dm.is_entry_synced("42", "e1") is True
 
 
+def test_add_synced_sessions_batch_skips_known_and_repeated(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    dm.add_synced_session("42", "e1", "2026-07-04", _session(60 * 60 * 1000, 500.0, "e1"))
+    added = dm.add_synced_sessions("42", [
+        ("e1", "2026-07-04", _session(60 * 60 * 1000, 500.0, "e1")),  # already synced
+        ("e2", "2026-07-05", _session(30 * 60 * 1000, 250.0, "e2")),
+        ("e2", "2026-07-05", _session(30 * 60 * 1000, 250.0, "e2")),  # repeated in batch
+    ])
+    assert added == [False, True, False]
+    ws = dm.get_work_sessions("42")
+    assert len(ws["2026-07-05"]["sessions"]) == 1
+    assert dm.count_synced_entries("42") == 2
+
+
 def test_count_synced_entries(tmp_path, monkeypatch):
     dm = _dm(tmp_path, monkeypatch)
     assert dm.count_synced_entries("42") == 0
@@ -74,3 +100,28 @@ def test_data_manager_requires_encryption_key(tmp_path, monkeypatch):
     from data_manager import DataManager
     with pytest.raises(RuntimeError):
         DataManager(str(tmp_path / "x.db"))
+
+
+async def test_replaced_and_reset_clickup_clients_close_their_sessions(tmp_path, monkeypatch):
+    import asyncio
+    dm = _dm(tmp_path, monkeypatch)
+    dm.set_clickup_settings("42", api_token="pk_SECRET", workspace_id="ws1")
+    client = dm.get_user_clickup_client("42")
+    old_session = await client._get_session()
+
+    dm.set_clickup_settings("42", api_token="pk_OTHER", workspace_id="ws1")
+    other = dm.get_user_clickup_client("42")
+    assert dm._closing_clients                               # ссылка на задачу закрытия
+    await asyncio.sleep(0)
+    assert old_session.closed
+
+    # Сброс из API идёт в пуле потоков — закрытие планируется в цикле сессии
+    other_session = await other._get_session()
+    await asyncio.to_thread(dm.clear_clickup_settings, "42")
+    for _ in range(100):
+        if other_session.closed and not dm._closing_clients:
+            break
+        await asyncio.sleep(0.01)
+    assert other_session.closed
+    assert not dm._closing_clients                           # ссылка отпущена после закрытия
+    assert "42" not in dm._clickup_clients
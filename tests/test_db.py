@@ -22,6 +22,12 @@ def test_pragmas_applied(tmp_path):
     assert conn.isolation_level is None
 
 
+def test_wal_commits_do_not_fsync_every_write(tmp_path):
+    conn = db.get_connection(str(tmp_path / "t.db"))
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1        # NORMAL
+    assert conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == db.WAL_AUTOCHECKPOINT_PAGES
+
+
 def test_init_schema_is_idempotent(tmp_path):
     path = str(tmp_path / "t.db")
     db.get_connection(path)
@@ -34,10 +34,10 @@ def test_parse_bonus_date():
     assert main.parse_bonus_date("") is None
 
 
-def test_valid_hhmm():
-    assert main.valid_hhmm("21:00") is True
-    assert main.valid_hhmm("9:05") is True
-    assert main.valid_hhmm("24:00") is False
-    assert main.valid_hhmm("21:60") is False
-    assert main.valid_hhmm("2100") is False
-    assert main.valid_hhmm("ab:cd") is False
+def test_parse_hhmm():
+    assert main.parse_hhmm("21:00") == (21, 0)
+    assert main.parse_hhmm("9:05") == (9, 5)
+    assert main.parse_hhmm("24:00") is None
+    assert main.parse_hhmm("21:60") is None
+    assert main.parse_hhmm("2100") is None
+    assert main.parse_hhmm("ab:cd") is None
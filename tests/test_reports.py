@@ -33,3 +33,74 @@ def test_tasks_summary_groups_by_task(tmp_path, monkeypatch):
     assert summary["total_tasks"] == 1
     assert "Задача А" in summary["tasks"]
     assert abs(summary["total_hours"] - 1.0) < 1e-9
+
+
+# Итоги по дням на границах недель: июнь 2026 начинается в понедельник, июль — в среду
+MONTH_WEEKS_TOTALS = {
+    "2026-06-01": {"total_hours": 2, "total_earnings": 1000},
+    "2026-06-07": {"total_hours": 1, "total_earnings": 500},
+    "2026-06-08": {"total_hours": 3, "total_earnings": 1500},
+    "2026-06-30": {"total_hours": 4, "total_earnings": 2000},
+    "2026-07-01": {"total_hours": 1, "total_earnings": 500},
+    "2026-07-05": {"total_hours": 2, "total_earnings": 1000},
+    "2026-07-06": {"total_hours": 3, "total_earnings": 1500},
+    "2026-07-31": {"total_hours": 5, "total_earnings": 2500},
+}
+
+
+def _month_weeks_text(dm, first, last):
+    import data_manager
+    weeks, hours, earnings = data_manager._month_weeks(MONTH_WEEKS_TOTALS, first, last)
+    return dm._weeks_report(dm.get_russian_month_year(first), weeks, hours, earnings)
+
+
+def test_month_weeks_for_month_starting_on_monday(tmp_path, monkeypatch):
+    from datetime import date
+    dm = _dm(tmp_path, monkeypatch)
+    # Ожидаемый текст — вывод прежнего обхода месяца по дням
+    assert _month_weeks_text(dm, date(2026, 6, 1), date(2026, 6, 30)) == (
+        "📊 Заработок по неделям в июнь 2026:\n\n"
+        "📅 Неделя 1 (01.06 - 07.06): 3ч = 1500.00 руб\n"
+        "📅 Неделя 2 (08.06 - 14.06): 3ч = 1500.00 руб\n"
+        "📅 Неделя 5 (29.06 - 30.06): 4ч = 2000.00 руб\n\n"
+        "📊 Итого за месяц:\n"
+        "📅 Недель с работой: 3\n"
+        "⏰ Всего отработано: 10ч\n"
+        "💰 Всего заработано: 5000.00 руб"
+    )
+
+
+def test_month_weeks_for_month_starting_midweek(tmp_path, monkeypatch):
+    from datetime import date
+    dm = _dm(tmp_path, monkeypatch)
+    import data_manager
+    assert _month_weeks_text(dm, date(2026, 7, 1), date(2026, 7, 31)) == (
+        "📊 Заработок по неделям в июль 2026:\n\n"
+        "📅 Неделя 1 (01.07 - 05.07): 3ч = 1500.00 руб\n"
+        "📅 Неделя 2 (06.07 - 12.07): 3ч = 1500.00 руб\n"
+        "📅 Неделя 5 (27.07 - 31.07): 5ч = 2500.00 руб\n\n"
+        "📊 Итого за месяц:\n"
+        "📅 Недель с работой: 3\n"
+        "⏰ Всего отработано: 11ч\n"
+        "💰 Всего заработано: 5500.00 руб"
+    )
+    # Текущий месяц обрезается сегодняшним днём: последняя неделя кончается на last
+    weeks, hours, _ = data_manager._month_weeks(
+        MONTH_WEEKS_TOTALS, date(2026, 7, 1), date(2026, 7, 8))
+    assert [(w["number"], w["start"], w["end"]) for w in weeks] == [
+        (1, date(2026, 7, 1), date(2026, 7, 5)),
+        (2, date(2026, 7, 6), date(2026, 7, 8)),
+    ]
+    assert hours == 6
+
+
+def test_earnings_period_start_covers_each_report():
+    from datetime import date
+    from data_manager import earnings_period_start
+    today = date(2026, 1, 14)  # среда
+    assert earnings_period_start("today", today) == "2026-01-14"
+    assert earnings_period_start("yesterday", today) == "2026-01-13"
+    assert earnings_period_start("week_details", today) == "2026-01-12"
+    assert earnings_period_start("month_weeks", today) == "2026-01-01"
+    assert earnings_period_start("prev_month_weeks", today) == "2025-12-01"
+    assert earnings_period_start("year", today) == "2026-01-01"
@@ -26,7 +26,7 @@ class FakeClient:
         self._entries = entries or []
         self._timer = timer
 
-    async def get_time_entries(self, start, end):
+    async def get_time_entries(self, start, end, raise_errors=False):
         return self._entries
 
     async def get_list(self, list_id):
@@ -144,6 +144,23 @@ async def test_tick_weekly_summary_on_sunday(tmp_path, monkeypatch):
     assert len([t for _, t in bot.sent if "недел" in t.lower()]) == 1
 
 
+@pytest.mark.asyncio
+async def test_weekly_summary_reads_only_current_week(tmp_path, monkeypatch):
+    from datetime import date, timedelta
+    dm = _dm(tmp_path, monkeypatch)
+    calls = []
+    real_totals = dm.get_daily_totals
+
+    def recording_totals(user_id, start_date=None, end_date=None):
+        calls.append(start_date)
+        return real_totals(user_id, start_date, end_date)
+
+    monkeypatch.setattr(dm, "get_daily_totals", recording_totals)
+    await BackgroundScheduler(dm, FakeBot())._send_weekly_summary("42", datetime(2026, 7, 5, 21, 5))
+    today = date.today()
+    assert calls == [(today - timedelta(days=today.weekday())).isoformat()]
+
+
 @pytest.mark.asyncio
 async def test_tick_long_timer_alert_once_per_run(tmp_path, monkeypatch):
     dm = _dm(tmp_path, monkeypatch)
@@ -176,7 +193,7 @@ async def test_tick_user_error_does_not_break_others(tmp_path, monkeypatch):
         dm.set_notification_settings(uid, notify_daily_digest=1)
 
     class BrokenClient(FakeClient):
-        async def get_time_entries(self, start, end):
+        async def get_time_entries(self, start, end, raise_errors=False):
             raise RuntimeError("boom")
 
     clients = {"1": BrokenClient(), "2": FakeClient(entries=[_entry("e2", (6, 10), 2)])}
@@ -200,3 +217,44 @@ async def test_tick_respects_autosync_disabled(tmp_path, monkeypatch):
     sched = BackgroundScheduler(dm, FakeBot())
     await sched._tick(datetime(2026, 7, 6, 12, 0))
     assert dm.get_work_sessions("42") == {}
+
+
+@pytest.mark.asyncio
+async def test_notify_retries_flood_control_and_paces_sends(tmp_path, monkeypatch):
+    from aiogram.exceptions import TelegramRetryAfter
+    from aiogram.methods import SendMessage
+    dm = _dm(tmp_path, monkeypatch)
+    clock = [100.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        clock[0] += delay
+
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(scheduler.asyncio, "sleep", fake_sleep)
+
+    class FloodBot(FakeBot):
+        def __init__(self):
+            super().__init__()
+            self.attempts = []
+
+        async def send_message(self, chat_id, text, **kwargs):
+            self.attempts.append((chat_id, clock[0]))
+            if len(self.attempts) == 1:
+                raise TelegramRetryAfter(method=SendMessage(chat_id=chat_id, text=text),
+                                         message="Flood control", retry_after=3)
+            self.sent.append((chat_id, text))
+
+    bot = FloodBot()
+    sched = BackgroundScheduler(dm, bot)
+    await sched._notify("1", scheduler.KIND_DAILY, "2026-07-06", "первый")
+    await sched._notify("2", scheduler.KIND_DAILY, "2026-07-06", "второй")
+
+    assert bot.sent == [(1, "первый"), (2, "второй")]
+    assert bot.attempts[0] == (1, 100.0)
+    assert bot.attempts[1] == (1, 103.0)                    # повтор после retry_after
+    assert bot.attempts[2][1] - bot.attempts[1][1] == pytest.approx(scheduler.NOTIFY_MIN_INTERVAL)
+    assert sleeps[0] == 3
+    assert sleeps[1] == pytest.approx(scheduler.NOTIFY_MIN_INTERVAL)
+    assert dm.was_notified("1", scheduler.KIND_DAILY, "2026-07-06")
@@ -14,7 +14,7 @@ class FakeClient:
     def __init__(self, entries):
         self._entries = entries
 
-    async def get_time_entries(self, start, end):
+    async def get_time_entries(self, start, end, raise_errors=False):
         return self._entries
 
     async def get_list(self, list_id):
@@ -75,3 +75,107 @@ async def test_sync_skips_negative_duration(tmp_path, monkeypatch):
     r = await dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 31))
     assert r["success"] and r["synced_count"] == 0
     assert dm.is_entry_synced("42", "run1") is False         # never marked
+
+
+@pytest.mark.asyncio
+async def test_sync_fetches_long_window_in_weekly_chunks(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    windows = []
+
+    class RecordingClient(FakeClient):
+        async def get_time_entries(self, start, end, raise_errors=False):
+            windows.append((start, end))
+            return self._entries
+
+    monkeypatch.setattr(dm, "get_user_clickup_client", lambda uid: RecordingClient([]))
+    await dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 20, 12))
+    assert windows == [
+        (datetime(2026, 7, 1), datetime(2026, 7, 8)),
+        (datetime(2026, 7, 8), datetime(2026, 7, 15)),
+        (datetime(2026, 7, 15), datetime(2026, 7, 20, 12)),
+    ]
+
+    windows.clear()
+    await dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 8))
+    assert len(windows) == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_fails_when_any_window_fails(tmp_path, monkeypatch):
+    dm = _dm(tmp_path, monkeypatch)
+    dm.set_rate("42", 600.0)
+    entry = {
+        "id": "e1", "duration": str(1000 * 60 * 60),
+        "start": str(int(datetime(2026, 7, 2, 10).timestamp() * 1000)),
+        "task": {"name": "Задача", "list": {"id": "L1"}},
+        "description": "",
+    }
+
+    class FlakyClient(FakeClient):
+        async def get_time_entries(self, start, end, raise_errors=False):
+            if start >= datetime(2026, 7, 8):
+                raise ValueError("HTTP 500: boom")
+            return self._entries
+
+    monkeypatch.setattr(dm, "get_user_clickup_client", lambda uid: FlakyClient([entry]))
+    result = await dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 20))
+    assert result["success"] is False
+    assert dm.get_work_sessions("42") == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sync_for_same_user_is_rejected(tmp_path, monkeypatch):
+    import asyncio
+    dm = _dm(tmp_path, monkeypatch)
+    release = asyncio.Event()
+
+    class SlowClient(FakeClient):
+        async def get_time_entries(self, start, end, raise_errors=False):
+            await release.wait()
+            return self._entries
+
+    monkeypatch.setattr(dm, "get_user_clickup_client", lambda uid: SlowClient([]))
+    first = asyncio.create_task(
+        dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 2)))
+    await asyncio.sleep(0)
+    second = await dm.sync_clickup_entries("42", datetime(2026, 7, 1), datetime(2026, 7, 2))
+    assert second["success"] is False
+    release.set()
+    assert (await first)["success"] is True
+
+
+@pytest.mark.asyncio
+async def test_repeated_sync_sees_entries_added_in_between(tmp_path, monkeypatch):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from clickup_client import ClickUpClient
+
+    dm = _dm(tmp_path, monkeypatch)
+    dm.set_rate("42", 600.0)
+    start_ms = str(int(datetime(2026, 7, 4, 10).timestamp() * 1000))
+    remote = [{"id": "e1", "duration": str(3600 * 1000), "start": start_ms,
+               "task": {"name": "Задача"}, "description": ""}]
+
+    async def time_entries(request):
+        return web.json_response({"data": remote})
+
+    app = web.Application()
+    app.router.add_get("/team/9/time_entries", time_entries)
+    server = TestServer(app)
+    await server.start_server()
+    client = ClickUpClient("pk_test", "9", team_id="9")
+    client.base_url = str(server.make_url(""))
+    monkeypatch.setattr(dm, "get_user_clickup_client", lambda uid: client)
+    try:
+        start, end = datetime(2026, 7, 4), datetime(2026, 7, 4, 23)
+        first = await dm.sync_clickup_entries("42", start, end)
+        assert first["synced_count"] == 1
+
+        # Запись остановили в ClickUp сразу после первого синка — в ту же минуту
+        remote.append({"id": "e2", "duration": str(1800 * 1000), "start": start_ms,
+                       "task": {"name": "Задача"}, "description": ""})
+        second = await dm.sync_clickup_entries("42", start, end)
+        assert second["synced_count"] == 1
+    finally:
+        await client.close()
+        await server.close()